@@ -0,0 +1,84 @@
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class DatabaseUnavailableError(Exception):
+    """
+    База данных недоступна: автомат разомкнут, либо истёк срок на повторные попытки
+    """
+
+
+class ConnectionCheckoutError(OSError):
+    """
+    Не удалось получить соединение из пула: запрос ещё не отправлен в базу, и его можно повторить
+    """
+
+
+class CircuitBreaker:
+    """
+    Общий для всех запросов автомат: после failure_threshold ошибок подключения подряд размыкается
+    и сразу отклоняет запросы, через reset_timeout секунд пропускает один пробный запрос
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.consecutive_failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self.retries = 0
+        self.deadline_exceeded = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._probe_in_flight:
+            self._state = HALF_OPEN
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self._state = CLOSED
+        self._probe_in_flight = False
+        self.consecutive_failures = 0
+
+    def release_probe(self):
+        """
+        Освобождает пробный запрос, завершившийся без ответа базы (например, отменённый):
+        это не успех и не ошибка подключения, следующий запрос снова станет пробным
+        """
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self._state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self._state != OPEN:
+                self.opened += 1
+            self._state = OPEN
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "retries": self.retries,
+            "deadline_exceeded": self.deadline_exceeded,
+        }
@@ -2,13 +2,23 @@ import asyncio
 import functools
 import logging
 import os
-from asyncio import current_task
-from typing import Any, Coroutine, TypeVar, Optional, Sequence
+import random
+import time
+from contextlib import asynccontextmanager
+from enum import Enum as PyEnum
+from typing import Any, AsyncIterator, Coroutine, TypeVar, Optional, Sequence
 from dotenv import load_dotenv
-from sqlalchemy import CursorResult, Result, URL
+from sqlalchemy import CursorResult, Result, URL, Row, insert, select
 from sqlalchemy.dialects.postgresql import asyncpg
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, async_scoped_session
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.db.Cache import TTLCache
+from app.db.CircuitBreaker import HALF_OPEN, CircuitBreaker, ConnectionCheckoutError, DatabaseUnavailableError
 from app.db.Database import Database
+from app.db.Dialect import configure_sqlite, upsert_insert
+from app.db.Jobs import JobRunner
+from app.db.Routing import DatabaseNode, ReplicaRouter
+from app.db.Statistics import NPlusOneDetector
+from app.db.config import DatabaseConfig
 from app.logger import setup_logging
 
 T = TypeVar('T')
@@ -25,17 +35,53 @@ class Singleton(type):
         return cls._instance
 
 
-def retry_connection(func):
+def retry_connection(func=None, *, idempotent: bool = True):
+    """
+    Повторяет запрос при ошибке подключения с экспоненциальной задержкой и случайным разбросом,
+    пока не истечёт срок retry_deadline. Общий автомат отклоняет запросы сразу, пока база недоступна.
+    Запись (idempotent=False) повторяется, только если не удалось получить соединение: после отправки
+    запроса неизвестно, успела ли база его зафиксировать
+    """
+    if func is None:
+        return functools.partial(retry_connection, idempotent=idempotent)
+
     @functools.wraps(func)
-    async def wrapper(*args, **kwargs):
+    async def wrapper(self, *args, **kwargs):
+        breaker = self.breaker
+        deadline = time.monotonic() + self.config.retry_deadline
         attempt = 0
         while True:
+            probing = breaker.state == HALF_OPEN
+            if not breaker.allow():
+                raise DatabaseUnavailableError("База данных недоступна")
             attempt += 1
             try:
-                return await func(*args, **kwargs)
-            except ConnectionRefusedError as e:
-                print(f"Ошибка подключения: {e}. Попытка {attempt}")
-                await asyncio.sleep(1)
+                result = await func(self, *args, **kwargs)
+            # Ошибки установки соединения (отказ, DNS, таймаут подключения), запрос до базы не дошёл
+            except OSError as e:
+                breaker.record_failure()
+                if not idempotent and not isinstance(e, ConnectionCheckoutError):
+                    raise DatabaseUnavailableError("Соединение с базой данных прервано во время записи") from e
+                delay = random.uniform(0, min(self.config.retry_max_delay,
+                                              self.config.retry_base_delay * 2 ** (attempt - 1)))
+                if time.monotonic() + delay >= deadline:
+                    breaker.deadline_exceeded += 1
+                    raise DatabaseUnavailableError("База данных недоступна") from e
+                breaker.retries += 1
+                self.logging.warning(f"Ошибка подключения: {e}. Попытка {attempt}, повтор через {delay:.2f} с")
+                await asyncio.sleep(delay)
+            except Exception:
+                # База ответила, ошибка не связана с подключением
+                breaker.record_success()
+                raise
+            except BaseException:
+                # Отмена запроса (CancelledError) ничего не говорит о базе, но пробный слот должен освободиться
+                if probing:
+                    breaker.release_probe()
+                raise
+            else:
+                breaker.record_success()
+                return result
 
     return wrapper
 
@@ -43,46 +89,125 @@ def retry_connection(func):
 class DAO(Database, metaclass=Singleton):
 
     def __init__(self):
-        url_object = URL.create(
-            drivername=os.getenv("DB_DRIVERNAME"),
-            username=os.getenv("POSTGRES_USER"),
-            password=os.getenv("POSTGRES_PASSWORD"),  # plain (unescaped) text
-            host=os.getenv("DB_HOST") if os.getenv("I_AM_DOCKER") else "localhost",
-            port=os.getenv("DB_PORT"),
-            database=os.getenv("POSTGRES_DB"),
-        )
+        self.config = DatabaseConfig.from_env()
+        if self.config.backend == "sqlite":
+            url_object = URL.create(drivername="sqlite+aiosqlite", database=self.config.sqlite_path)
+        else:
+            url_object = URL.create(
+                drivername=os.getenv("DB_DRIVERNAME"),
+                username=os.getenv("POSTGRES_USER"),
+                password=os.getenv("POSTGRES_PASSWORD"),  # plain (unescaped) text
+                host=os.getenv("DB_HOST") if os.getenv("I_AM_DOCKER") else "localhost",
+                port=os.getenv("DB_PORT"),
+                database=os.getenv("POSTGRES_DB"),
+            )
         self.logging = setup_logging(name="DAO")
         self.logging.debug(url_object.render_as_string())
-        self.db_engine = create_async_engine(url_object, pool_recycle=3, pool_pre_ping=True)
-        self.Session = async_scoped_session(async_sessionmaker(bind=self.db_engine), current_task)
+        engine_url = self.config.url(url_object)
+        self.primary = DatabaseNode("primary", create_async_engine(engine_url, **self.config.engine_options()),
+                                    self.config.slow_query_ms)
+        replicas = [DatabaseNode(f"{host}:{port or url_object.port}",
+                                 create_async_engine(engine_url.set(host=host, port=port or url_object.port),
+                                                     **self.config.engine_options()),
+                                 self.config.slow_query_ms)
+                    for host, port in self.config.replicas()]
+        if self.config.backend == "sqlite":
+            configure_sqlite(self.primary.engine)
+        self.router = ReplicaRouter(self.primary, replicas, self.config.read_your_writes_window)
+        self.db_engine = self.primary.engine
+        self.pool_statistics = self.primary.pool_statistics
+        self.Session = self.primary.Session
+        self.n_plus_one = NPlusOneDetector(self.config.n_plus_one_threshold, self.logging)
+        self.breaker = CircuitBreaker(self.config.breaker_failure_threshold, self.config.breaker_reset_timeout)
+        self.jobs = JobRunner(self.logging)
+        self.user_cache = TTLCache(self.config.user_cache_size, self.config.user_cache_ttl)
         super().__init__(self, url_object)
         self.logging.info("DAO initialized")
 
+    @property
+    def dialect(self) -> str:
+        return self.db_engine.dialect.name
+
+    def insert(self, model):
+        """
+        INSERT с on_conflict_do_update / on_conflict_do_nothing для диалекта текущей базы
+        """
+        return upsert_insert(self.dialect, model)
+
+    @asynccontextmanager
+    async def _session(self, node: DatabaseNode = None):
+        node = node or self.primary
+        async with node.Session() as sess:
+            # Соединение берётся заранее, чтобы замерить время ожидания свободного соединения в пуле
+            started = time.perf_counter()
+            try:
+                await sess.connection()
+            except OSError as e:
+                raise ConnectionCheckoutError(*e.args) from e
+            node.pool_statistics.add_wait(time.perf_counter() - started)
+            yield sess
+
     @retry_connection
-    async def GetSingle(self, stmt) -> Coroutine[Any, Optional[T], Any]:
-        async with self.Session() as sess:
-            result = await sess.scalars(stmt)
+    async def GetSingle(self, stmt, params: dict = None, use_primary: bool = False) -> Coroutine[Any, Optional[T], Any]:
+        async with self._session(self.router.read(use_primary)) as sess:
+            result = await sess.scalars(stmt, params)
             return result.first()
 
     @retry_connection
-    async def GetAll(self, stmt) -> Coroutine[Any, Sequence[T], Any]:
-        async with self.Session() as sess:
-            result = await sess.scalars(stmt)
+    async def GetAll(self, stmt, params: dict = None, use_primary: bool = False) -> Coroutine[Any, Sequence[T], Any]:
+        async with self._session(self.router.read(use_primary)) as sess:
+            result = await sess.scalars(stmt, params)
             return result.all()
 
     @retry_connection
+    async def GetRows(self, stmt, params: dict = None, use_primary: bool = False) -> Sequence[Row]:
+        """
+        Строки выборки из нескольких колонок, а не только первой, как в GetAll
+        """
+        async with self._session(self.router.read(use_primary)) as sess:
+            result = await sess.execute(stmt, params)
+            return result.all()
+
+    async def Stream(self, stmt, params: dict = None, use_primary: bool = False) -> AsyncIterator[T]:
+        """
+        Отдаёт объекты по мере чтения серверного курсора, не загружая всю выборку в память
+        """
+        async with self._session(self.router.read(use_primary)) as sess:
+            result = await sess.stream_scalars(stmt.execution_options(yield_per=self.config.stream_batch_size), params)
+            async for item in result:
+                yield item
+
+    @retry_connection(idempotent=False)
     async def ExecuteNonQuery(self, stmt) -> Result[Any] | CursorResult[Any]:
-        async with self.Session() as sess:
+        async with self._session() as sess:
             try:
                 result = await sess.execute(stmt)
                 await sess.commit()
+                self.router.record_write()
                 return result
             except Exception as e:
                 raise e
 
-    @retry_connection
+    @retry_connection(idempotent=False)
+    async def ExecuteAutocommit(self, stmt) -> Result[Any] | CursorResult[Any]:
+        """
+        Выполняет запрос вне транзакции, для команд, которые нельзя выполнять в блоке транзакции
+        (например, DETACH PARTITION CONCURRENTLY)
+        """
+        conn = self.db_engine.connect()
+        try:
+            await conn.start()
+        except OSError as e:
+            raise ConnectionCheckoutError(*e.args) from e
+        try:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            return await conn.execute(stmt)
+        finally:
+            await conn.close()
+
+    @retry_connection(idempotent=False)
     async def ExecuteListNonQuery(self, db_objects: list):
-        async with self.Session() as sess:
+        async with self._session() as sess:
             try:
                 sess.add_all(db_objects)
                 await sess.flush()
@@ -91,33 +216,115 @@ class DAO(Database, metaclass=Singleton):
                          for obj in db_objects]
                 new_objects = [obj[0](**obj[1]) for obj in dicts]
                 await sess.commit()
+                self.router.record_write()
                 return new_objects
             except Exception as e:
                 print(e)
                 raise e
 
-    @retry_connection
+    @retry_connection(idempotent=False)
     async def ExecuteListNonQueryIgnoreObj(self, db_objects: list):
-        async with self.Session() as sess:
+        async with self._session() as sess:
             try:
-                async with sess.begin():
-                    sess.add_all(db_objects)
+                sess.add_all(db_objects)
                 await sess.commit()
+                self.router.record_write()
                 return True
             except Exception as e:
                 print(e)
                 await sess.rollback()
                 raise e
 
-    @retry_connection
+    @retry_connection(idempotent=False)
     async def ExecuteListNonQueryIgnore(self, db_objects: list):
-        async with self.Session() as sess:
+        async with self._session() as sess:
             try:
                 for obj in db_objects:
                     await sess.execute(obj)
                 await sess.commit()
+                self.router.record_write()
                 return True
             except Exception as e:
                 print(e)
                 raise e
 
+    @retry_connection(idempotent=False)
+    async def ExecuteManyNonQuery(self, batches: list[tuple[Any, list[dict]]]) -> list[Sequence[Row] | int]:
+        """
+        Выполняет пачки (запрос, список параметров) через executemany в одной транзакции
+        :return: для каждой пачки строки RETURNING, либо количество затронутых строк
+        """
+        async with self._session() as sess:
+            try:
+                results = []
+                for stmt, params in batches:
+                    result = await sess.execute(stmt, params)
+                    if isinstance(result, CursorResult) and not result.returns_rows:
+                        results.append(result.rowcount)
+                    else:
+                        results.append(result.all())
+                await sess.commit()
+                self.router.record_write()
+                return results
+            except Exception:
+                self.logging.exception("Ошибка пакетного выполнения запросов")
+                raise
+
+    @retry_connection(idempotent=False)
+    async def ExecuteBulkInsert(self, model, rows: list[dict], returning: bool = True) -> Sequence[Row] | int:
+        """
+        Вставляет строки одним запросом INSERT ... VALUES (...), (...) RETURNING.
+        Большие пачки без RETURNING на asyncpg загружаются через COPY.
+        :return: вставленные строки, либо их количество при returning=False
+        """
+        if not rows:
+            return [] if returning else 0
+        table = model.__table__
+        async with self._session() as sess:
+            try:
+                if not returning and len(rows) >= self.config.copy_threshold \
+                        and sess.bind.dialect.driver == "asyncpg":
+                    result = await self._copy_records(sess, table, rows)
+                elif returning:
+                    result = (await sess.execute(insert(table).returning(*table.c), rows)).all()
+                else:
+                    result = (await sess.execute(insert(table), rows)).rowcount
+                await sess.commit()
+                self.router.record_write()
+                return result
+            except Exception:
+                self.logging.exception(f"Ошибка массовой вставки в {table.name}")
+                raise
+
+    @staticmethod
+    async def _copy_records(sess, table, rows: list[dict]) -> int:
+        columns = [column for column in table.c
+                   if any(column.name in row for row in rows) or column.default is not None]
+        defaults = {}
+        for column in columns:
+            default = column.default
+            if default is None:
+                continue
+            if default.is_scalar:
+                defaults[column.name] = default.arg
+            elif default.is_clause_element:
+                # Серверное выражение (например, now()) вычисляется один раз в текущей транзакции
+                defaults[column.name] = await sess.scalar(select(default.arg))
+        records = []
+        for row in rows:
+            record = []
+            for column in columns:
+                value = row[column.name] if column.name in row else defaults.get(column.name)
+                if value is None and column.default is not None and column.default.is_callable:
+                    value = column.default.arg(None)
+                if isinstance(value, PyEnum):
+                    # Enum в схеме хранится по имени элемента
+                    value = value.name
+                record.append(value)
+            records.append(tuple(record))
+        connection = await sess.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            table.name, records=records, columns=[column.name for column in columns])
+        return len(records)
+
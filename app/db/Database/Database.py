@@ -1,7 +1,10 @@
 import asyncio
+import functools
+import hashlib
 import inspect
 import os
 from pathlib import Path
+from typing import Optional
 from urllib.parse import quote_plus
 
 from alembic import command, context
@@ -10,15 +13,54 @@ from alembic.runtime.environment import EnvironmentContext
 from alembic.script import ScriptDirectory
 
 import alembic.config
-from sqlalchemy import URL, engine_from_config, pool, create_engine, Connection
+from sqlalchemy import URL, engine_from_config, pool, create_engine, Connection, func, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import OperationalError, ProgrammingError
 
 from .DatabaseAdmin import DatabaseAdmin
 from .DatabaseConfirm import DatabaseConfirm
 from .DatabaseMessage import DatabaseMessage
+from .DatabasePartition import DatabasePartition
+from .DatabaseRevokedToken import DatabaseRevokedToken
 from .DatabaseTransaction import DatabaseTransaction
 from .DatabaseUser import DatabaseUser
+from .DatabaseStreak import DatabaseStreak
 from .DatabaseUserSession import DatabaseUserSession
+from ..Dialect import sqlite_metadata
+from ..Jobs import PeriodicJob
 from ..schema import Base
+from ..schema.Entity.SchemaFingerprint import SchemaFingerprint
+
+
+# Ключ pg_advisory_lock, под которым выполняется миграция
+MIGRATION_LOCK_KEY = 0x5f3759df
+
+
+def schema_fingerprint(metadata=Base.metadata) -> str:
+    """
+    sha256 от канонического описания таблиц, колонок, ограничений и индексов моделей.
+    Не зависит от порядка импорта моделей
+    """
+    dialect = postgresql.dialect()
+    lines = []
+    for table in sorted(metadata.tables.values(), key=lambda t: t.name):
+        lines.append(f"table {table.name} {sorted((k, str(v)) for k, v in table.dialect_kwargs.items())}")
+        for column in table.columns:
+            computed = column.computed.sqltext if column.computed is not None else None
+            server_default = column.server_default.arg if column.server_default is not None and computed is None \
+                else None
+            lines.append(f"column {column.name} {column.type.compile(dialect=dialect)} "
+                         f"{list(getattr(column.type, 'enums', []))} nullable={column.nullable} "
+                         f"pk={column.primary_key} server_default={server_default} computed={computed}")
+        for constraint in sorted(table.constraints, key=lambda c: (type(c).__name__, str(c.name))):
+            targets = [element.target_fullname for element in getattr(constraint, "elements", [])]
+            lines.append(f"constraint {type(constraint).__name__} {constraint.name} "
+                         f"{[column.name for column in constraint.columns]} {targets} "
+                         f"{getattr(constraint, 'sqltext', '')}")
+        for index in sorted(table.indexes, key=lambda i: str(i.name)):
+            lines.append(f"index {index.name} unique={index.unique} {[str(e) for e in index.expressions]} "
+                         f"{sorted((k, str(v)) for k, v in index.dialect_kwargs.items())}")
+    return hashlib.sha256("\n".join(lines).encode()).hexdigest()
 
 
 class Database:
@@ -30,39 +72,108 @@ class Database:
         self.Confirm = DatabaseConfirm(instance)
         self.Admin = DatabaseAdmin(instance)
         self.Message = DatabaseMessage(instance)
+        self.Partition = DatabasePartition(instance)
+        self.Streak = DatabaseStreak(instance)
+        self.RevokedToken = DatabaseRevokedToken(instance)
+        if instance.config.compact_interval:
+            instance.jobs.add(PeriodicJob(
+                "balance_compactor",
+                functools.partial(self.Transaction.compact, instance.config.compact_batch_size),
+                instance.config.compact_interval))
+        instance.jobs.add(PeriodicJob("session_flush", self.UserSession.flush,
+                                      instance.config.session_flush_interval, run_on_stop=True))
+        instance.jobs.add(PeriodicJob(
+            "confirmation_token_purge",
+            functools.partial(self.Confirm.purge_expired, instance.config.purge_batch_size),
+            instance.config.purge_interval))
+        instance.jobs.add(PeriodicJob(
+            "revoked_token_purge",
+            functools.partial(self.RevokedToken.purge_expired, instance.config.purge_batch_size),
+            instance.config.purge_interval))
+        instance.jobs.add(PeriodicJob(
+            "session_purge",
+            functools.partial(self.UserSession.purge_idle, instance.config.session_idle_days,
+                              instance.config.purge_batch_size),
+            instance.config.purge_interval))
+        instance.jobs.add(PeriodicJob(
+            "partition_maintenance",
+            functools.partial(self.Partition.maintain, instance.config.partition_months_ahead,
+                              instance.config.partition_retention_months),
+            instance.config.partition_interval))
         # self.UserProfile = DatabaseUserProfile(instance)
 
     async def checkDatabase(self):
-        class_path = inspect.getfile(self.__class__)
-        print("Class path:", class_path)
-        # Получаем директорию, убирая имя файла
-        directory_path = Path(class_path).parent
-        # Формируем полный путь к конфигурационному файлу
-        config_path = directory_path / 'alembic.ini'
-        alembic_config = alembic.config.Config(config_path)
-        script = ScriptDirectory.from_config(alembic_config)
-        env_context = EnvironmentContext(
-            alembic_config,
-            script,
-            as_sql=False,
-        )
+        """
+        Быстрая проверка при старте: один запрос сравнивает отпечаток схемы моделей с сохранённым при последней миграции.
+        Сравнение схемы через alembic и сама миграция выполняются только в режиме запуска migrate
+        """
+        fingerprint = schema_fingerprint()
+        if await self._stored_fingerprint() == fingerprint:
+            return
+        # Локальная база SQLite создаётся по моделям при первом запуске
+        if not self.instance.config.migrate_on_boot and self.instance.dialect == "postgresql":
+            raise Exception("Схема базы данных не соответствует моделям, "
+                            "выполните миграцию: python main.py --custom_run_mode migrate")
+        await self.migrate()
+
+    async def migrate(self):
+        """
+        Применяет ревизии alembic, при оставшихся различиях создаёт и применяет автогенерированную ревизию,
+        затем сохраняет отпечаток схемы
+        """
+        fingerprint = schema_fingerprint()
+        if self.instance.dialect != "postgresql":
+            # Ревизии alembic написаны для PostgreSQL, остальные базы создаются по моделям
+            async with self.instance.db_engine.begin() as conn:
+                await conn.run_sync(sqlite_metadata(Base.metadata).create_all)
+            await self._backfill()
+            await self._store_fingerprint(fingerprint)
+            return
+        alembic_config = alembic.config.Config(Path(inspect.getfile(self.__class__)).parent / 'alembic.ini')
+        async with self.instance.db_engine.connect() as lock_conn:
+            # Экземпляры, запущенные одновременно, мигрируют по очереди
+            await lock_conn.execute(select(func.pg_advisory_lock(MIGRATION_LOCK_KEY)))
+            try:
+                if await self._stored_fingerprint() == fingerprint:
+                    return
+                # env.py запускает собственный цикл событий, поэтому команды alembic выполняются в отдельном потоке
+                await asyncio.to_thread(command.upgrade, alembic_config, 'head')
+                if await self._diff(alembic_config):
+                    await asyncio.to_thread(command.revision, alembic_config, autogenerate=True)
+                    await asyncio.to_thread(command.upgrade, alembic_config, 'head')
+                # Секционированная таблица без секций не принимает строки
+                await self.Partition.ensure(self.instance.config.partition_months_ahead)
+                await self._backfill()
+                await self._store_fingerprint(fingerprint)
+            finally:
+                await lock_conn.execute(select(func.pg_advisory_unlock(MIGRATION_LOCK_KEY)))
+
+    async def _backfill(self):
+        """
+        Однократное заполнение денормализованных данных по истории после создания их таблиц
+        """
+        if await self.Streak.is_empty():
+            await self.Streak.backfill()
 
+    async def _store_fingerprint(self, fingerprint: str):
+        stmt = self.instance.insert(SchemaFingerprint).values(id=1, fingerprint=fingerprint)
+        await self.instance.ExecuteNonQuery(stmt.on_conflict_do_update(
+            index_elements=[SchemaFingerprint.id],
+            set_=dict(fingerprint=stmt.excluded.fingerprint, applied_at=func.now())))
+
+    async def _stored_fingerprint(self) -> Optional[str]:
+        try:
+            return await self.instance.GetSingle(select(SchemaFingerprint.fingerprint).where(SchemaFingerprint.id == 1),
+                                                 use_primary=True)
+        except (ProgrammingError, OperationalError):
+            # Таблицы ещё нет: база ни разу не мигрировалась в режиме migrate
+            return None
+
+    async def _diff(self, alembic_config) -> list:
+        env_context = EnvironmentContext(alembic_config, ScriptDirectory.from_config(alembic_config), as_sql=False)
         async with self.instance.db_engine.connect() as conn:
             def get_diff(connection):
                 env_context.configure(connection=connection, target_metadata=Base.metadata)
                 return compare_metadata(env_context.get_context(), Base.metadata)
 
-            diff = await conn.run_sync(get_diff)
-
-        def diff_action():
-            def run_auto_migration():
-                try:
-                    command.revision(alembic_config, autogenerate=True)
-                    command.upgrade(alembic_config, 'head')
-                except Exception as e:
-                    raise e
-
-            if diff:
-                run_auto_migration()
-
-        diff_action()
+            return await conn.run_sync(get_diff)
@@ -1,7 +1,8 @@
-from typing import List
+from typing import AsyncIterator
 
-from sqlalchemy import select, desc
+from sqlalchemy import select
 
+from app.db.Pagination import DEFAULT_PAGE_SIZE, Page, keyset, page
 from app.db.schema.Entity.User import User
 from app.db.schema.Entity.Transaction import Transaction
 
@@ -12,11 +13,18 @@ class DatabaseAdmin:
     def __init__(self, instance):
         self._instance = instance
 
-    async def get_all_users(self):
-        stmt = select(User)
-        return await self._instance.GetAll(stmt)
+    async def get_all_users(self, limit: int = DEFAULT_PAGE_SIZE, after: tuple = None) -> Page:
+        stmt = keyset(select(User), [User.created_at, User.id], after, limit, descending=True)
+        return page(await self._instance.GetAll(stmt), ["created_at", "id"], limit)
 
-    async def get_transactions(self) -> List[Transaction]:
-        stmt = select(Transaction).order_by(desc(Transaction.created_at))
-        return await self._instance.GetAll(stmt)
+    async def get_transactions(self, limit: int = DEFAULT_PAGE_SIZE, after: tuple = None) -> Page:
+        stmt = keyset(select(Transaction), [Transaction.created_at, Transaction.id], after, limit, descending=True)
+        return page(await self._instance.GetAll(stmt), ["created_at", "id"], limit)
 
+    def stream_users(self) -> AsyncIterator[User]:
+        stmt = select(User).order_by(User.created_at, User.id)
+        return self._instance.Stream(stmt)
+
+    def stream_transactions(self) -> AsyncIterator[Transaction]:
+        stmt = select(Transaction).order_by(Transaction.created_at, Transaction.id)
+        return self._instance.Stream(stmt)
@@ -2,12 +2,15 @@ from datetime import datetime, timedelta
 from typing import Any, Coroutine, Optional
 
 import sqlalchemy
-from sqlalchemy import CursorResult, func, select, delete, text
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import CursorResult, func, select, delete, text, bindparam, insert, update
 
 from app.db.schema import ConfirmationToken
 from app.db.schema.Base import TokenType
 
+GET_ACTIVE = select(ConfirmationToken).where(ConfirmationToken.expires_at > func.now(),
+                                             ConfirmationToken.type_code == bindparam("token_type"),
+                                             ConfirmationToken.user_id == bindparam("user_id"))
+
 
 class DatabaseConfirm:
     voice_path = None
@@ -15,7 +18,7 @@ class DatabaseConfirm:
     def __init__(self, instance):
         self._instance = instance
 
-    async def post(self, user_id: str, code: int, type_code: TokenType) -> Coroutine[Any,CursorResult,Any]:
+    async def post(self, user_id: str, code: str, type_code: TokenType) -> Coroutine[Any,CursorResult,Any]:
         try:
             stmt = insert(ConfirmationToken).values(
                 user_id=user_id,
@@ -30,11 +33,34 @@ class DatabaseConfirm:
             return await self.post(user_id, code, type_code)
 
     def get(self, token_type: TokenType, user_id: str) -> Coroutine[Any,Optional[ConfirmationToken],Any]:
-        conditions = [ConfirmationToken.expires_at > func.now(),
-                      ConfirmationToken.type_code == token_type,
-                      ConfirmationToken.user_id == user_id]
-        stmt = select(ConfirmationToken).where(*conditions)
-        return self._instance.GetSingle(stmt)
-
+        return self._instance.GetSingle(GET_ACTIVE, {"token_type": token_type, "user_id": user_id}, use_primary=True)
 
+    async def attempt(self, token_type: TokenType, user_id: str, max_attempts: int) -> Optional[str]:
+        """
+        Засчитывает попытку проверки кода одним UPDATE, параллельные попытки не обходят ограничение
+        :return: HMAC кода, None если кода нет, он истёк или попытки исчерпаны
+        """
+        stmt = update(ConfirmationToken).where(ConfirmationToken.user_id == user_id,
+                                               ConfirmationToken.type_code == token_type,
+                                               ConfirmationToken.expires_at > func.now(),
+                                               ConfirmationToken.attempts < max_attempts) \
+            .values(attempts=ConfirmationToken.attempts + 1).returning(ConfirmationToken.code) \
+            .execution_options(synchronize_session=False)
+        rows = (await self._instance.ExecuteManyNonQuery([(stmt, None)]))[0]
+        return rows[0].code if rows else None
 
+    async def purge_expired(self, batch_size: int) -> int:
+        """
+        Удаляет истёкшие коды пачками по batch_size, каждая пачка в своей короткой транзакции.
+        Строки, заблокированные другими запросами, пропускаются до следующего запуска
+        :return: количество удалённых строк
+        """
+        total = 0
+        while True:
+            expired = select(ConfirmationToken.user_id).where(ConfirmationToken.expires_at < func.now()) \
+                .limit(batch_size).with_for_update(skip_locked=True)
+            result = await self._instance.ExecuteNonQuery(
+                delete(ConfirmationToken).where(ConfirmationToken.user_id.in_(expired)))
+            total += result.rowcount
+            if result.rowcount < batch_size:
+                return total
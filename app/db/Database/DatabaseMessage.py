@@ -1,36 +1,153 @@
+import functools
 import uuid
+from typing import Optional
 
-from sqlalchemy import select
-from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, bindparam, insert, update, case, func, cast, literal, and_, Float
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.orm import selectinload, joinedload
 
+from app.db.Database.DatabaseStreak import DatabaseStreak
+from app.db.Pagination import DEFAULT_PAGE_SIZE, Page, keyset, page
 from app.db.schema import Dialogue, DialogueMessage
+from app.db.schema.Base import LanguageCode
+from app.db.schema.Entity.DialogueMessage import SEARCH_CONFIGS
+
+GET_DIALOGUE = select(Dialogue).where(Dialogue.user_id == bindparam("user_id"), Dialogue.id == bindparam("dialogue_id"))
+GET_DIALOGUES = select(Dialogue).where(Dialogue.user_id == bindparam("user_id"))
+GET_DIALOGUE_SUMMARIES = select(Dialogue).where(Dialogue.user_id == bindparam("user_id")) \
+    .options(joinedload(Dialogue.last_message))
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10"
+# Замены как в html.escape, & - первым
+HTML_ESCAPES = [("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#x27;")]
+GET_MESSAGES = select(DialogueMessage).where(DialogueMessage.dialogue_id == bindparam("dialogue_id"))
+
+
+def html_escape(value):
+    """
+    Экранирует текст в запросе. Парсер ts_headline считает сущности &...; отдельными лексемами
+    и переносит их в фрагмент как есть, поэтому единственная разметка в фрагменте - выделение
+    """
+    return functools.reduce(lambda escaped, pair: func.replace(escaped, *pair), HTML_ESCAPES, value)
 
 
 class DatabaseMessage:
     def __init__(self, instance):
         self._instance = instance
+        self._streak = DatabaseStreak(instance)
 
     async def create_dialogue(self, user_id, name):
         stmt = insert(Dialogue).values(id=uuid.uuid4().hex,user_id=user_id, name=name)
         return await self._instance.ExecuteNonQuery(stmt)
 
     async def get_dialogue(self, user_id, dialogue_id):
-        stmt = select(Dialogue).where(Dialogue.user_id == user_id, Dialogue.id == dialogue_id)
-        return await self._instance.GetSingle(stmt)
+        return await self._instance.GetSingle(GET_DIALOGUE, {"user_id": user_id, "dialogue_id": dialogue_id})
 
-    async def get_dialogues(self, user_id):
-        stmt = select(Dialogue).where(Dialogue.user_id == user_id)
-        return await self._instance.GetAll(stmt)
+    async def get_dialogues(self, user_id, limit: int = DEFAULT_PAGE_SIZE, after: tuple = None) -> Page:
+        """
+        Диалоги пользователя по убыванию последней активности, id случайный и задаёт только порядок при равенстве
+        """
+        stmt = keyset(GET_DIALOGUES, [Dialogue.last_activity_at, Dialogue.id], after, limit, descending=True)
+        return page(await self._instance.GetAll(stmt, {"user_id": user_id}), ["last_activity_at", "id"], limit)
 
-    async def get_messages(self, dialogue_id):
-        stmt = select(DialogueMessage).where(DialogueMessage.dialogue_id == dialogue_id)
-        return await self._instance.GetAll(stmt)
+    async def get_dialogue_summaries(self, user_id, limit: int = DEFAULT_PAGE_SIZE, after: tuple = None) -> Page:
+        """
+        Диалоги пользователя по убыванию последней активности вместе с последним сообщением и числом сообщений,
+        одним запросом без загрузки остальных сообщений
+        """
+        stmt = keyset(GET_DIALOGUE_SUMMARIES, [Dialogue.last_activity_at, Dialogue.id], after, limit, descending=True)
+        return page(await self._instance.GetAll(stmt, {"user_id": user_id}), ["last_activity_at", "id"], limit)
+
+    async def get_messages(self, dialogue_id, limit: int = DEFAULT_PAGE_SIZE, after: tuple = None) -> Page:
+        stmt = keyset(GET_MESSAGES, [DialogueMessage.id], after, limit)
+        return page(await self._instance.GetAll(stmt, {"dialogue_id": dialogue_id}), ["id"], limit)
+
+    async def search(self, user_id, query: str, language: Optional[LanguageCode] = None,
+                     limit: int = DEFAULT_PAGE_SIZE, after: tuple = None) -> Page:
+        """
+        Полнотекстовый поиск по сообщениям диалогов пользователя, по убыванию релевантности.
+        Совпадения находятся по GIN-индексу search_vector, фрагменты с выделением строятся только для строк страницы.
+        :param language: искать только в конфигурации этого языка, иначе во всех SEARCH_CONFIGS
+        :return: строки с колонками сообщения, rank и headline - экранированный HTML с совпадениями в <mark>
+        """
+        configs = [SEARCH_CONFIGS[language]] if language else list(SEARCH_CONFIGS.values())
+        if self._instance.dialect == "postgresql":
+            queries = {config: func.websearch_to_tsquery(cast(config, REGCONFIG), query) for config in configs}
+            tsquery = functools.reduce(lambda left, right: left.op("||")(right), queries.values())
+            match = DialogueMessage.search_vector.op("@@")(tsquery)
+            rank = func.ts_rank_cd(DialogueMessage.search_vector, tsquery, 32, type_=Float)
+            # Выделение строится той конфигурацией, в которой сообщение совпало с запросом
+            headline = case(*[(func.to_tsvector(cast(config, REGCONFIG), func.coalesce(DialogueMessage.text, ""))
+                               .op("@@")(config_query),
+                               func.ts_headline(cast(config, REGCONFIG), html_escape(DialogueMessage.text),
+                                                config_query, HEADLINE_OPTIONS))
+                              for config, config_query in queries.items()], else_=html_escape(DialogueMessage.text))
+        else:
+            # Без полнотекстового поиска: подстрока без ранжирования и выделения
+            match = DialogueMessage.text.contains(query, autoescape=True)
+            rank = literal(0.0, Float)
+            headline = html_escape(DialogueMessage.text)
+
+        hits = keyset(
+            select(DialogueMessage.id, DialogueMessage.timestamp, rank.label("rank"))
+            .join(Dialogue, Dialogue.id == DialogueMessage.dialogue_id)
+            .where(Dialogue.user_id == user_id, match),
+            [rank, DialogueMessage.id], after, limit, descending=True
+        ).subquery("hits")
+        stmt = select(DialogueMessage.id, DialogueMessage.dialogue_id, DialogueMessage.content_type,
+                      DialogueMessage.sender, DialogueMessage.text, DialogueMessage.timestamp,
+                      hits.c.rank, headline.label("headline")) \
+            .join(hits, and_(DialogueMessage.id == hits.c.id, DialogueMessage.timestamp == hits.c.timestamp)) \
+            .order_by(hits.c.rank.desc(), hits.c.id.desc())
+        return page(await self._instance.GetRows(stmt), ["rank", "id"], limit)
 
     async def get_dialogues_with_messages(self, user_id):
         stmt = select(Dialogue).where(Dialogue.user_id == user_id).options(selectinload(Dialogue.messages))
         return await self._instance.GetAll(stmt)
 
-    async def create_message(self, dialogue_id, content_type, sender, text):
-        stmt = insert(DialogueMessage).values(dialogue_id=dialogue_id, content_type=content_type, sender=sender, text=text)
-        return await self._instance.ExecuteNonQuery(stmt)
+    @staticmethod
+    def _update_summary(dialogue_id, count: int):
+        """
+        Обновляет сводку диалога в транзакции вставки сообщений.
+        Последнее сообщение меняется, только если оно новее записанного: параллельная вставка
+        с меньшим id, закоммиченная позже, не откатит сводку назад
+        """
+        last = select(DialogueMessage.id, DialogueMessage.timestamp) \
+            .where(DialogueMessage.dialogue_id == dialogue_id).order_by(DialogueMessage.id.desc()).limit(1)
+        last_id = last.with_only_columns(DialogueMessage.id).scalar_subquery()
+        last_timestamp = last.with_only_columns(DialogueMessage.timestamp).scalar_subquery()
+        newer = func.coalesce(Dialogue.last_message_id, 0) < last_id
+        return update(Dialogue).where(Dialogue.id == dialogue_id).values(
+            message_count=Dialogue.message_count + count,
+            last_message_id=case((newer, last_id), else_=Dialogue.last_message_id),
+            last_activity_at=case((newer, last_timestamp), else_=Dialogue.last_activity_at),
+        ).execution_options(synchronize_session=False)
+
+    async def create_message(self, dialogue_id, content_type, sender, text) -> int:
+        """
+        :return: id созданного сообщения
+        """
+        stmt = insert(DialogueMessage.__table__).values(dialogue_id=dialogue_id, content_type=content_type,
+                                                        sender=sender, text=text).returning(DialogueMessage.id)
+        rows, _, _ = await self._instance.ExecuteManyNonQuery([
+            (stmt, None),
+            (self._update_summary(dialogue_id, 1), None),
+            (self._streak.touch(dialogue_id), None),
+        ])
+        return rows[0][0]
+
+    async def create_messages(self, dialogue_id, messages: list[dict]):
+        """
+        Массовая вставка сообщений диалога (например, импорт истории).
+        :param messages: словари с ключами content_type, sender, text и, при необходимости, timestamp
+        """
+        if not messages:
+            return []
+        rows = [{"dialogue_id": dialogue_id, **message} for message in messages]
+        table = DialogueMessage.__table__
+        inserted, _, _ = await self._instance.ExecuteManyNonQuery([
+            (insert(table).returning(*[column for column in table.c if column is not table.c.search_vector],
+                                     sort_by_parameter_order=True), rows),
+            (self._update_summary(dialogue_id, len(rows)), None),
+            (self._streak.touch(dialogue_id), None),
+        ])
+        return inserted
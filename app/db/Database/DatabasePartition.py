@@ -0,0 +1,163 @@
+import re
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import text, exists, select, table as table_clause, column, func, update, case
+
+from app.db.schema import Base, Dialogue, DialogueMessage
+
+PARTITION_BOUND = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+
+
+def partitioned_tables() -> dict:
+    """
+    Таблицы моделей, секционированные по диапазону: имя таблицы -> колонка ключа
+    """
+    tables = {}
+    for table in Base.metadata.tables.values():
+        partition_by = table.dialect_options["postgresql"].get("partition_by")
+        if partition_by and partition_by.upper().startswith("RANGE"):
+            tables[table.name] = partition_by[partition_by.index("(") + 1:partition_by.rindex(")")].strip()
+    return tables
+
+
+def month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    month = value.month - 1 + months
+    return value.replace(year=value.year + month // 12, month=month % 12 + 1)
+
+
+def partition_name(table: str, start: datetime) -> str:
+    return f"{table}_p{start:%Y%m}"
+
+
+def _parse_bound(value: str) -> Optional[datetime]:
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(value.strip("'"))
+
+
+class DatabasePartition:
+    """
+    Помесячные секции таблиц с postgresql_partition_by: создание будущих секций и отсоединение старых
+    """
+
+    def __init__(self, instance):
+        self._instance = instance
+
+    @staticmethod
+    def _check_table(table: str):
+        if table not in partitioned_tables():
+            raise Exception("Таблица не секционирована")
+
+    async def get(self, table: str) -> list[dict]:
+        """
+        :return: секции таблицы по возрастанию границ, start/end равны None для MINVALUE/MAXVALUE
+        """
+        self._check_table(table)
+        if self._instance.dialect != "postgresql":
+            return []
+        stmt = text("SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint "
+                    "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                    "WHERE i.inhparent = to_regclass(:parent)")
+        result = await self._instance.ExecuteNonQuery(stmt.bindparams(parent=f'"{table}"'))
+        partitions = []
+        for name, bound, rows in result.all():
+            match = PARTITION_BOUND.search(bound or "")
+            if match is None:
+                continue
+            partitions.append({"table": table, "name": name, "start": _parse_bound(match.group(1)),
+                               "end": _parse_bound(match.group(2)), "rows": max(rows, 0)})
+        return sorted(partitions, key=lambda partition: partition["end"] or datetime.max)
+
+    async def ensure(self, months_ahead: int) -> int:
+        """
+        Создаёт секции без пропусков от последней существующей до months_ahead месяцев вперёд.
+        Всё, что раньше первой секции, попадает в секцию истории от MINVALUE, чтобы импорт
+        старых сообщений и транзакций не падал на отсутствующей секции
+        :return: количество созданных секций
+        """
+        # Секционирование объявлено только для PostgreSQL
+        if self._instance.dialect != "postgresql":
+            return 0
+        created = 0
+        target = add_months(month_start(datetime.now()), months_ahead + 1)
+        for table in partitioned_tables():
+            partitions = await self.get(table)
+            ends = [partition["end"] for partition in partitions if partition["end"] is not None]
+            start = max(ends) if ends else month_start(datetime.now())
+            if not any(partition["start"] is None for partition in partitions):
+                first = min((partition["start"] for partition in partitions), default=start)
+                await self._instance.ExecuteNonQuery(text(
+                    f'CREATE TABLE IF NOT EXISTS "{table}_history" PARTITION OF "{table}" '
+                    f"FOR VALUES FROM (MINVALUE) TO ('{first.isoformat()}')"))
+                created += 1
+            while start < target:
+                end = add_months(start, 1)
+                await self._instance.ExecuteNonQuery(text(
+                    f'CREATE TABLE IF NOT EXISTS "{partition_name(table, start)}" PARTITION OF "{table}" '
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"))
+                created += 1
+                start = end
+        return created
+
+    async def detach(self, table: str, before: datetime, drop: bool = False) -> list[str]:
+        """
+        Отсоединяет секции, целиком лежащие раньше before, и при drop удаляет их.
+        Отсоединение и удаление секции не зависят от числа строк в ней.
+        :return: имена отсоединённых секций
+        """
+        self._check_table(table)
+        detached = []
+        for partition in await self.get(table):
+            if partition["end"] is None or partition["end"] > before:
+                continue
+            # Ещё не перенесённые в снимок баланса транзакции удалять нельзя
+            if "compacted" in Base.metadata.tables[table].c:
+                pending = select(exists().where(~column("compacted")).select_from(table_clause(partition["name"])))
+                if (await self._instance.ExecuteNonQuery(pending)).scalar():
+                    raise Exception(f"В секции {partition['name']} есть неперенесённые транзакции")
+            await self._instance.ExecuteAutocommit(
+                text(f'ALTER TABLE "{table}" DETACH PARTITION "{partition["name"]}" CONCURRENTLY'))
+            if table == DialogueMessage.__tablename__:
+                await self._forget_messages(partition)
+            if drop:
+                await self._instance.ExecuteAutocommit(text(f'DROP TABLE "{partition["name"]}"'))
+            detached.append(partition["name"])
+        return detached
+
+    async def _forget_messages(self, partition: dict):
+        """
+        Вычитает сообщения отсоединённой секции из сводок диалогов. Последнее сообщение ищется заново
+        только у диалогов, чья последняя активность была раньше конца секции: более новую сводку,
+        записанную параллельной вставкой, пересчёт не трогает
+        """
+        detached = table_clause(partition["name"], column("dialogue_id"))
+        removed = select(detached.c.dialogue_id, func.count().label("messages")) \
+            .group_by(detached.c.dialogue_id).subquery("removed")
+        last = select(DialogueMessage.id, DialogueMessage.timestamp) \
+            .where(DialogueMessage.dialogue_id == Dialogue.id).order_by(DialogueMessage.id.desc()).limit(1)
+        last_id = last.with_only_columns(DialogueMessage.id).scalar_subquery()
+        last_timestamp = last.with_only_columns(DialogueMessage.timestamp).scalar_subquery()
+        stale = Dialogue.last_activity_at < partition["end"]
+        await self._instance.ExecuteNonQuery(update(Dialogue).where(Dialogue.id == removed.c.dialogue_id).values(
+            message_count=Dialogue.message_count - removed.c.messages,
+            last_message_id=case((stale, last_id), else_=Dialogue.last_message_id),
+            last_activity_at=case((stale, func.coalesce(last_timestamp, Dialogue.last_activity_at)),
+                                  else_=Dialogue.last_activity_at),
+        ).execution_options(synchronize_session=False))
+
+    async def maintain(self, months_ahead: int, retention_months: int) -> int:
+        """
+        Задача обслуживания: будущие секции и, если задан срок хранения, удаление старых
+        :return: количество созданных и удалённых секций
+        """
+        processed = await self.ensure(months_ahead)
+        if retention_months and self._instance.dialect == "postgresql":
+            before = add_months(month_start(datetime.now()), -retention_months)
+            for table in partitioned_tables():
+                processed += len(await self.detach(table, before, drop=True))
+        return processed
@@ -0,0 +1,40 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import select, delete
+
+from app.db.schema import RevokedToken
+
+
+class DatabaseRevokedToken:
+    """
+    Использованные одноразовые токены, общие для всех процессов. Строка нужна только до истечения токена
+    """
+
+    def __init__(self, instance):
+        self._instance = instance
+
+    async def consume(self, jti: str, expires_at: datetime) -> bool:
+        """
+        Отмечает токен использованным одной вставкой по первичному ключу
+        :param expires_at: время истечения в UTC без часового пояса
+        :return: False, если токен уже был использован
+        """
+        stmt = self._instance.insert(RevokedToken).values(jti=jti, expires_at=expires_at)
+        result = await self._instance.ExecuteNonQuery(stmt.on_conflict_do_nothing(index_elements=[RevokedToken.jti]))
+        return result.rowcount == 1
+
+    async def purge_expired(self, batch_size: int) -> int:
+        """
+        Удаляет записи истёкших токенов пачками по batch_size. Граница считается по часам приложения в UTC,
+        как и expires_at, поэтому часовой пояс базы не важен
+        :return: количество удалённых строк
+        """
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None)
+        total = 0
+        while True:
+            expired = select(RevokedToken.jti).where(RevokedToken.expires_at < cutoff) \
+                .limit(batch_size).with_for_update(skip_locked=True)
+            result = await self._instance.ExecuteNonQuery(delete(RevokedToken).where(RevokedToken.jti.in_(expired)))
+            total += result.rowcount
+            if result.rowcount < batch_size:
+                return total
@@ -0,0 +1,94 @@
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import select, literal, case, func, Date
+
+from app.db.schema import Dialogue, DialogueMessage, UserStreak
+
+
+def consecutive_days(days: list[date]) -> int:
+    """
+    :param days: дни активности по убыванию без повторов
+    :return: длина серии подряд идущих дней, заканчивающейся первым днём
+    """
+    streak = 0
+    for day in days:
+        if streak and days[streak - 1] - day != timedelta(days=1):
+            break
+        streak += 1
+    return streak
+
+
+class DatabaseStreak:
+    """
+    Серия дней подряд с сообщениями, хранится строкой на пользователя и обновляется при вставке сообщений
+    """
+
+    def __init__(self, instance):
+        self._instance = instance
+
+    def touch(self, dialogue_id, today: Optional[date] = None):
+        """
+        Запрос отметки активности владельца диалога, выполняется в транзакции вставки сообщений.
+        Строка меняется только первым сообщением за день, остальные сообщения дня её не трогают
+        """
+        today = today or date.today()
+        stmt = self._instance.insert(UserStreak).from_select(
+            [UserStreak.user_id, UserStreak.current_streak, UserStreak.last_active_date],
+            select(Dialogue.user_id, literal(1), literal(today, Date)).where(Dialogue.id == dialogue_id))
+        return stmt.on_conflict_do_update(
+            index_elements=[UserStreak.user_id],
+            set_={
+                "current_streak": case((UserStreak.last_active_date == today - timedelta(days=1),
+                                        UserStreak.current_streak + 1), else_=1),
+                "last_active_date": today,
+            },
+            where=UserStreak.last_active_date.is_(None) | (UserStreak.last_active_date < today))
+
+    async def get(self, user_id, today: Optional[date] = None) -> int:
+        """
+        :return: текущая серия, 0 если последний активный день раньше вчерашнего
+        """
+        today = today or date.today()
+        streak = await self._instance.GetSingle(select(UserStreak).where(UserStreak.user_id == user_id))
+        if streak is None or streak.last_active_date is None or streak.last_active_date < today - timedelta(days=1):
+            return 0
+        return streak.current_streak
+
+    async def is_empty(self) -> bool:
+        return await self._instance.GetSingle(select(UserStreak.user_id).limit(1), use_primary=True) is None
+
+    async def backfill(self, batch_size: int = 1000) -> int:
+        """
+        Однократно заполняет серии по истории сообщений, пачками пользователей.
+        Серию, уже обновлённую новым сообщением позже прочитанной истории, не перезаписывает
+        :return: количество заполненных пользователей
+        """
+        day = func.date(DialogueMessage.timestamp, type_=Date).label("day")
+        stmt = self._instance.insert(UserStreak.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserStreak.user_id],
+            set_={"current_streak": stmt.excluded.current_streak, "last_active_date": stmt.excluded.last_active_date},
+            where=UserStreak.last_active_date.is_(None) | (UserStreak.last_active_date <= stmt.excluded.last_active_date))
+        total = 0
+        after = None
+        while True:
+            users = select(Dialogue.user_id).distinct().order_by(Dialogue.user_id).limit(batch_size)
+            if after is not None:
+                users = users.where(Dialogue.user_id > after)
+            user_ids = await self._instance.GetAll(users, use_primary=True)
+            if not user_ids:
+                return total
+            rows = await self._instance.GetRows(
+                select(Dialogue.user_id, day).join(DialogueMessage, DialogueMessage.dialogue_id == Dialogue.id)
+                .where(Dialogue.user_id.in_(user_ids)).group_by(Dialogue.user_id, day)
+                .order_by(Dialogue.user_id, day.desc()), use_primary=True)
+            days = {}
+            for user_id, active_day in rows:
+                days.setdefault(user_id, []).append(active_day)
+            streaks = [{"user_id": user_id, "current_streak": consecutive_days(user_days),
+                        "last_active_date": user_days[0]} for user_id, user_days in days.items()]
+            if streaks:
+                await self._instance.ExecuteManyNonQuery([(stmt, streaks)])
+            total += len(streaks)
+            after = user_ids[-1]
@@ -1,8 +1,8 @@
 from typing import List, Optional
 
-from sqlalchemy import select, update, desc
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import select, update, literal, func, insert
 
+from app.db.Pagination import DEFAULT_PAGE_SIZE, Page, keyset, page
 from app.db.schema import UserBalance
 from app.db.schema.Base import TransactionType
 from app.db.schema.Entity.Transaction import Transaction
@@ -12,29 +12,95 @@ class DatabaseTransaction:
     def __init__(self, instance):
         self._instance = instance
 
-    def get(self, user_id: str) -> List[Transaction]:
-        stmt = select(Transaction).where(Transaction.user_id == user_id).order_by(desc(Transaction.created_at))
-        return self._instance.GetAll(stmt)
+    async def get(self, user_id: str, limit: int = DEFAULT_PAGE_SIZE, after: tuple = None) -> Page:
+        stmt = keyset(select(Transaction).where(Transaction.user_id == user_id),
+                      [Transaction.created_at, Transaction.id], after, limit, descending=True)
+        return page(await self._instance.GetAll(stmt), ["created_at", "id"], limit)
 
     def get_admin(self) -> List[Transaction]:
         stmt = select(Transaction)
         return self._instance.GetAll(stmt)
 
     async def post(self, user_id: str, amount: int, description: str, transaction_type: TransactionType) -> Optional[int]:
+        """
+        Дописывает транзакцию в журнал, строка баланса не блокируется и не изменяется.
+        Списания одного пользователя выполняются по очереди под advisory-блокировкой транзакции,
+        поэтому два параллельных списания не уводят баланс в минус.
+        :return: баланс после записи, прочитанный в той же транзакции
+        """
+        balance = select(UserBalance.voice_seconds.label("voice_seconds")).where(UserBalance.user_id == user_id)
+        # sqlite3 не возвращает rowcount для запроса, начинающегося с WITH
+        current = balance.subquery("current")
 
-        stmt = select(UserBalance).where(UserBalance.user_id == user_id)
-        result = await self._instance.GetSingle(stmt)
-
+        source = select(literal(user_id, Transaction.user_id.type),
+                        literal(amount, Transaction.amount.type),
+                        literal(description, Transaction.description.type),
+                        literal(transaction_type, Transaction.transaction_type.type)).select_from(current)
+        batches = []
         if transaction_type == TransactionType.CREDIT:
-            if result.voice_seconds < amount:
-                raise Exception("Недостаточно средств")
+            source = source.where(current.c.voice_seconds >= amount)
+            # В SQLite пишущая транзакция одна на базу, в PostgreSQL под READ COMMITTED проверку
+            # остатка нужно сериализовать: следующее списание увидит баланс после этого
+            if self._instance.dialect == "postgresql":
+                batches.append((select(func.pg_advisory_xact_lock(func.hashtext(user_id))), None))
+        columns = [Transaction.user_id, Transaction.amount, Transaction.description, Transaction.transaction_type]
+        batches.append((insert(Transaction).from_select(columns, source), None))
+        batches.append((select(UserBalance.voice_seconds).where(UserBalance.user_id == user_id), None))
+
+        *_, inserted, rows = await self._instance.ExecuteManyNonQuery(batches)
+        if not inserted:
+            raise Exception("Недостаточно средств")
+        return rows[0][0]
 
-        stmt = insert(Transaction).values(user_id=user_id, amount=amount, description=description, transaction_type=transaction_type)
-        result = await self._instance.ExecuteNonQuery(stmt)
+    async def post_many(self, transactions: list[dict]) -> int:
+        """
+        Массовое пополнение балансов одной пакетной вставкой в журнал
+        :param transactions: словари с ключами user_id, amount, description, transaction_type
+        :return: количество записанных транзакций
+        """
+        if any(transaction["transaction_type"] != TransactionType.DEBIT for transaction in transactions):
+            raise Exception("Массово можно только пополнять баланс")
+        return await self._instance.ExecuteBulkInsert(Transaction, transactions, returning=False)
 
-        stmt_update_user_balance = update(UserBalance).where(UserBalance.user_id == user_id).values(
-            voice_seconds=UserBalance.voice_seconds + amount if transaction_type == TransactionType.DEBIT else UserBalance.voice_seconds - amount
-        )
+    async def compact(self, batch_size: int = 10000) -> int:
+        """
+        Переносит транзакции, ещё не учтённые в снимке баланса, в user_balance пачками.
+        Отметка транзакций и изменение снимка выполняются одним запросом, поэтому чтение баланса всегда согласовано.
+        :return: количество перенесённых транзакций
+        """
+        if self._instance.dialect != "postgresql":
+            return await self._compact_serialized()
+        total = 0
+        while True:
+            pending = select(Transaction.id).where(~Transaction.compacted).limit(batch_size) \
+                .with_for_update(skip_locked=True)
+            folded = update(Transaction).where(Transaction.id.in_(pending)).values(compacted=True) \
+                .returning(Transaction.user_id, Transaction.signed_amount().label("seconds")).cte("folded")
+            delta = select(folded.c.user_id,
+                           func.sum(folded.c.seconds).label("seconds"),
+                           func.count().label("transactions")).group_by(folded.c.user_id).cte("delta")
+            stmt = update(UserBalance).where(UserBalance.user_id == delta.c.user_id).values(
+                snapshot_seconds=UserBalance.snapshot_seconds + delta.c.seconds
+            ).returning(delta.c.transactions).execution_options(synchronize_session=False)
+            result = await self._instance.ExecuteNonQuery(stmt)
+            folded_count = sum(row[0] for row in result.all())
+            total += folded_count
+            if folded_count < batch_size:
+                return total
 
-        result = await self._instance.ExecuteNonQuery(stmt_update_user_balance)
-        return result
+    async def _compact_serialized(self) -> int:
+        """
+        Перенос для диалектов без изменяющих данные CTE и SKIP LOCKED (SQLite).
+        Пишущая транзакция в SQLite одна на базу, поэтому всё переносится за раз.
+        """
+        pending = select(Transaction.user_id).where(~Transaction.compacted)
+        seconds = select(func.sum(Transaction.signed_amount())).where(
+            Transaction.user_id == UserBalance.user_id, ~Transaction.compacted).scalar_subquery()
+        _, folded = await self._instance.ExecuteManyNonQuery([
+            (update(UserBalance).where(UserBalance.user_id.in_(pending)).values(
+                snapshot_seconds=UserBalance.snapshot_seconds + seconds
+            ).execution_options(synchronize_session=False), None),
+            (update(Transaction).where(~Transaction.compacted).values(compacted=True)
+             .execution_options(synchronize_session=False), None),
+        ])
+        return folded
@@ -1,9 +1,17 @@
 import uuid
 from typing import Any, Coroutine, Optional
 
-from sqlalchemy import CursorResult, select, delete, update
+from sqlalchemy import CursorResult, Row, select, delete, update, bindparam
 
 from app.db.schema import User, UserProfile, UserBalance
+from app.db.schema.Base import Role
+
+# Горячие выборки собраны один раз, значения передаются параметрами
+GET_BY_EMAIL = select(User).where(User.email == bindparam("email"))
+GET_BY_ID = select(User).where(User.id == bindparam("user_id"))
+GET_BY_TELEGRAM_ID = select(User).where(User.telegram_id == bindparam("telegram_id"))
+# Поля, нужные для проверки авторизации, без профиля и баланса
+GET_AUTH_BY_ID = select(User.id, User.session_key, User.disabled, User.role).where(User.id == bindparam("user_id"))
 
 
 class DatabaseUser:
@@ -12,22 +20,37 @@ class DatabaseUser:
 
     def get(self, email: str = None, user_id: str = None, telegram_id: int = None) -> Coroutine[Any, Optional[User], Any]:
         if email:
-            stmt = select(User).where(User.email == email)
+            return self._instance.GetSingle(GET_BY_EMAIL, {"email": email})
         elif user_id:
-            stmt = select(User).where(User.id == user_id)
+            return self._instance.GetSingle(GET_BY_ID, {"user_id": user_id})
         elif telegram_id:
-            stmt = select(User).where(User.telegram_id == telegram_id)
+            return self._instance.GetSingle(GET_BY_TELEGRAM_ID, {"telegram_id": telegram_id})
         else:
             return None
-        return self._instance.GetSingle(stmt)
+
+    async def get_cached(self, user_id: str) -> Optional[Row]:
+        """
+        Поля проверки авторизации (id, session_key, disabled, role) из кэша, при промахе - из базы.
+        Все они меняются только через _update, который сбрасывает кэш
+        """
+        return await self._instance.user_cache.get(user_id, lambda: self._get_auth(user_id))
+
+    async def _get_auth(self, user_id: str) -> Optional[Row]:
+        rows = await self._instance.GetRows(GET_AUTH_BY_ID, {"user_id": user_id})
+        return rows[0] if rows else None
+
+    async def _update(self, user_id: str, stmt) -> CursorResult:
+        # Сброс после фиксации: загрузка, начатая до неё, не попадёт в кэш со старыми данными
+        result = await self._instance.ExecuteNonQuery(stmt)
+        self._instance.user_cache.invalidate(user_id)
+        return result
 
     def set_telegram_id(self, user_id: str, telegram_id: int) -> Coroutine[Any, CursorResult, Any]:
         stmt = update(User).where(User.id == user_id).values(telegram_id=telegram_id)
-        return self._instance.ExecuteNonQuery(stmt)
+        return self._update(user_id, stmt)
 
     def get_tg_id(self, tg_id: int) -> Coroutine[Any, Optional[User], Any]:
-        stmt = select(User).where(User.telegram_id == tg_id)
-        return self._instance.GetSingle(stmt)
+        return self._instance.GetSingle(GET_BY_TELEGRAM_ID, {"telegram_id": tg_id})
 
     async def post(self, email, password,
                    telegram_id, session_key: str, name) -> str:
@@ -35,7 +58,7 @@ class DatabaseUser:
         stmts = [User(id=user_id, email=email, password=password,
                       telegram_id=telegram_id, session_key=session_key),
                  UserProfile(user_id=user_id, name=name),
-                 UserBalance(user_id=user_id, voice_seconds=0)]
+                 UserBalance(user_id=user_id, snapshot_seconds=0)]
         if await self._instance.ExecuteListNonQueryIgnoreObj(stmts):
             return user_id
         else:
@@ -43,22 +66,26 @@ class DatabaseUser:
 
     def delete(self, user_id: str) -> Coroutine[Any, CursorResult, Any]:
         stmt = delete(User).where(User.id == user_id)
-        return self._instance.ExecuteNonQuery(stmt)
+        return self._update(user_id, stmt)
 
     async def update_confirm_email(self, user_id: str) -> Coroutine[Any, CursorResult, Any]:
         stmt_update = update(User).where(User.id == user_id).values(email_verified=True)
-        await self._instance.ExecuteNonQuery(stmt_update)
+        await self._update(user_id, stmt_update)
 
     async def update_confirm_telegram(self, user_id: str) -> Coroutine[Any, CursorResult, Any]:
         stmt_update = update(User).where(User.id == user_id).values(telegram_verified=True)
-        await self._instance.ExecuteNonQuery(stmt_update)
+        await self._update(user_id, stmt_update)
 
     def update_password(self, user_id: str, password: str) -> Coroutine[Any, CursorResult, Any]:
         stmt = update(User).where(User.id == user_id).values(password=password)
-        return self._instance.ExecuteNonQuery(stmt)
+        return self._update(user_id, stmt)
 
     def set_session_key(self, user_id: str, session_key: str) -> Coroutine[Any, CursorResult, Any]:
         stmt = update(User).where(User.id == user_id).values(session_key=session_key)
-        return self._instance.ExecuteNonQuery(stmt)
+        return self._update(user_id, stmt)
+
+    def set_role(self, user_id: str, role: Role) -> Coroutine[Any, CursorResult, Any]:
+        stmt = update(User).where(User.id == user_id).values(role=role)
+        return self._update(user_id, stmt)
 
     # def get_balance
@@ -1,24 +1,107 @@
+from datetime import datetime, timedelta
 from typing import Any, Coroutine
 
-from sqlalchemy import CursorResult, func
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import CursorResult, func, delete, select
 
 from app.db.schema import UserSession
 
+# Строк в одном многострочном upsert, держит число параметров запроса ниже лимитов драйверов
+SESSIONS_PER_STATEMENT = 1000
+# Длина колонки user_agent: более длинная строка из заголовка клиента ломала бы запись всего буфера
+USER_AGENT_MAX_LENGTH = UserSession.user_agent.type.length
+
 
 class DatabaseUserSession:
     def __init__(self, instance):
         self._instance = instance
+        # Отложенные отметки сессий: ключи словаря уникальны, поэтому в одном upsert нет повторяющихся строк
+        self._pending: dict[tuple[str, str], None] = {}
+        self._failed_flushes = 0
+        self.dropped = 0
 
     def post(self, session_key: str, user_agent: str) -> Coroutine[Any, CursorResult, Any]:
-        stmt = insert(UserSession).values(
+        stmt = self._instance.insert(UserSession).values(
             session_key=session_key,
             user_agent=user_agent
-        ).on_conflict_do_update(
+        )
+        stmt = stmt.on_conflict_do_update(
             index_elements=[UserSession.session_key, UserSession.user_agent],
             set_={
-                "user_agent": insert(UserSession).excluded.user_agent,
+                "user_agent": stmt.excluded.user_agent,
                 "create_at": func.now()
             }
         )
         return self._instance.ExecuteNonQuery(stmt)
+
+    def post_many(self, sessions: list[tuple[str, str]]) -> Coroutine[Any, list, Any]:
+        """
+        Пакетный upsert сессий: многострочные INSERT ... VALUES (...), (...) ON CONFLICT по SESSIONS_PER_STATEMENT
+        строк в одной транзакции
+        :param sessions: пары (session_key, user_agent)
+        """
+        batches = []
+        for start in range(0, len(sessions), SESSIONS_PER_STATEMENT):
+            stmt = self._instance.insert(UserSession.__table__).values([
+                {"session_key": session_key, "user_agent": user_agent}
+                for session_key, user_agent in sessions[start:start + SESSIONS_PER_STATEMENT]
+            ])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[UserSession.session_key, UserSession.user_agent],
+                set_={
+                    "user_agent": stmt.excluded.user_agent,
+                    "create_at": func.now()
+                }
+            )
+            batches.append((stmt, None))
+        return self._instance.ExecuteManyNonQuery(batches)
+
+    def touch(self, session_key: str, user_agent: str):
+        """
+        Откладывает upsert сессии до следующего flush, не обращаясь к базе.
+        Отметки сверх session_buffer_size отбрасываются
+        """
+        key = (session_key, user_agent[:USER_AGENT_MAX_LENGTH])
+        if key not in self._pending and len(self._pending) >= self._instance.config.session_buffer_size:
+            self.dropped += 1
+            return
+        self._pending[key] = None
+
+    async def flush(self) -> int:
+        """
+        Записывает накопленные отметки сессий многострочными upsert в одной транзакции
+        :return: количество записанных сессий
+        """
+        if not self._pending:
+            return 0
+        sessions, self._pending = self._pending, {}
+        try:
+            await self.post_many(list(sessions))
+        except Exception:
+            self._failed_flushes += 1
+            if self._failed_flushes >= self._instance.config.session_flush_max_attempts:
+                # Пачка, которая не записывается несколько раз подряд, не должна останавливать все следующие
+                self._failed_flushes = 0
+                self.dropped += len(sessions)
+                self._instance.logging.error(f"Отброшено {len(sessions)} отметок сессий после "
+                                             f"{self._instance.config.session_flush_max_attempts} неудачных записей")
+            else:
+                # Отметки возвращаются в буфер и будут записаны при следующем flush
+                self._pending = {**sessions, **self._pending}
+            raise
+        self._failed_flushes = 0
+        return len(sessions)
+
+    async def purge_idle(self, idle_days: int, batch_size: int) -> int:
+        """
+        Удаляет сессии, не использованные idle_days дней, пачками по batch_size с пропуском заблокированных строк
+        :return: количество удалённых строк
+        """
+        cutoff = datetime.now() - timedelta(days=idle_days)
+        total = 0
+        while True:
+            idle = select(UserSession.id).where(UserSession.create_at < cutoff) \
+                .limit(batch_size).with_for_update(skip_locked=True)
+            result = await self._instance.ExecuteNonQuery(delete(UserSession).where(UserSession.id.in_(idle)))
+            total += result.rowcount
+            if result.rowcount < batch_size:
+                return total
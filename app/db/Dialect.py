@@ -0,0 +1,66 @@
+from sqlalchemy import MetaData, PrimaryKeyConstraint, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import functions
+
+# INSERT с поддержкой on_conflict_do_update / on_conflict_do_nothing и excluded для каждого диалекта
+UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def upsert_insert(dialect_name: str, model):
+    try:
+        return UPSERT_INSERTS[dialect_name](model)
+    except KeyError:
+        raise Exception(f"Диалект {dialect_name} не поддерживает upsert")
+
+
+@compiles(functions.now, "sqlite")
+def _sqlite_now(element, compiler, **kw):
+    # Тот же формат, в котором SQLAlchemy сохраняет datetime в SQLite, иначе строки сравниваются неверно
+    return "STRFTIME('%Y-%m-%d %H:%M:%f000', 'now', 'localtime')"
+
+
+@compiles(TSVECTOR, "sqlite")
+def _sqlite_tsvector(element, compiler, **kw):
+    return "TEXT"
+
+
+def configure_sqlite(engine: AsyncEngine):
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # ondelete="CASCADE" в схеме работает только с включёнными внешними ключами
+        cursor.execute("PRAGMA foreign_keys=ON")
+        # Читатели не ждут пишущую транзакцию
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+
+def sqlite_metadata(metadata: MetaData) -> MetaData:
+    """
+    Копия схемы для SQLite. У секционированных в PostgreSQL таблиц первичный ключ - только id,
+    потому что SQLite автоматически нумерует лишь одиночный INTEGER PRIMARY KEY.
+    Колонки tsvector остаются пустыми, GIN-индексы не создаются: поиск в SQLite идёт через LIKE
+    """
+    copy = MetaData(naming_convention=metadata.naming_convention)
+    for table in metadata.sorted_tables:
+        table.to_metadata(copy)
+    for table in copy.tables.values():
+        for column in table.columns:
+            if isinstance(column.type, TSVECTOR):
+                column.computed = column.server_default = column.server_onupdate = None
+        for index in list(table.indexes):
+            if index.dialect_options["postgresql"].get("using") == "gin":
+                table.indexes.discard(index)
+        if not table.dialect_options["postgresql"].get("partition_by"):
+            continue
+        for column in table.primary_key.columns:
+            if column.name != "id":
+                column.primary_key = False
+        table.append_constraint(PrimaryKeyConstraint(table.c.id, name=table.primary_key.name))
+    return copy
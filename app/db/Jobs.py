@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+
+class PeriodicJob:
+    """
+    Фоновая задача, выполняемая каждые interval секунд. Функция задачи возвращает количество обработанных строк
+    """
+
+    def __init__(self, name: str, func: Callable[[], Awaitable[Optional[int]]], interval: float,
+                 run_on_stop: bool = False):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        # Выполнить ещё раз при остановке приложения, чтобы не потерять накопленные данные
+        self.run_on_stop = run_on_stop
+        self.runs = 0
+        self.failures = 0
+        self.processed = 0
+        self.last_processed: Optional[int] = None
+        self.last_run_at: Optional[datetime] = None
+        self.last_duration_ms = 0.0
+        self.last_error: Optional[str] = None
+
+    async def run_once(self, logger: logging.Logger):
+        started = time.perf_counter()
+        self.last_run_at = datetime.now()
+        try:
+            result = await self.func()
+        except Exception as e:
+            self.failures += 1
+            self.last_error = repr(e)
+            logger.exception(f"Фоновая задача {self.name} завершилась с ошибкой")
+        else:
+            self.runs += 1
+            self.last_error = None
+            self.last_processed = result
+            self.processed += result or 0
+        finally:
+            self.last_duration_ms = (time.perf_counter() - started) * 1000
+
+    async def run_forever(self, logger: logging.Logger):
+        while True:
+            await self.run_once(logger)
+            await asyncio.sleep(self.interval)
+
+    def snapshot(self) -> dict:
+        return {
+            "name": self.name,
+            "interval": self.interval,
+            "runs": self.runs,
+            "failures": self.failures,
+            "processed": self.processed,
+            "last_processed": self.last_processed,
+            "last_run_at": self.last_run_at,
+            "last_duration_ms": self.last_duration_ms,
+            "last_error": self.last_error,
+        }
+
+
+class JobRunner:
+    """
+    Запускает фоновые задачи в цикле событий приложения и останавливает их при завершении
+    """
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+        self.jobs: dict[str, PeriodicJob] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    def add(self, job: PeriodicJob):
+        self.jobs[job.name] = job
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(job.run_forever(self.logger), name=job.name)
+                       for job in self.jobs.values()]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job in self.jobs.values():
+            if job.run_on_stop:
+                await job.run_once(self.logger)
+
+    def snapshot(self) -> list[dict]:
+        return [job.snapshot() for job in self.jobs.values()]
@@ -0,0 +1,65 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, NamedTuple, Optional, Sequence
+
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class Page(NamedTuple):
+    items: Sequence[Any]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(*values) -> str:
+    """
+    Упаковывает значения ключа последней строки страницы в непрозрачную строку
+    """
+    payload = [{"dt": value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(payload, list) or not payload:
+        raise ValueError("Invalid cursor")
+    return tuple(datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value for value in payload)
+
+
+def keyset(stmt, columns: list, after: Optional[tuple], limit: int, descending: bool = False):
+    """
+    Добавляет к выборке условие "после курсора", сортировку по ключу и лимит на одну строку больше страницы,
+    чтобы понять, есть ли следующая страница
+    """
+    if after is not None:
+        if len(after) != len(columns):
+            raise ValueError("Invalid cursor")
+        key = tuple_(*columns) if len(columns) > 1 else columns[0]
+        value = tuple(after) if len(columns) > 1 else after[0]
+        stmt = stmt.where(key < value if descending else key > value)
+        if len(columns) > 1:
+            # Сравнение кортежей не используется для отсечения секций, поэтому первая колонка ограничивается отдельно
+            stmt = stmt.where(columns[0] <= after[0] if descending else columns[0] >= after[0])
+    order = [column.desc() if descending else column.asc() for column in columns]
+    return stmt.order_by(*order).limit(page_size(limit) + 1)
+
+
+def page(items: Sequence[Any], attributes: list[str], limit: int) -> Page:
+    limit = page_size(limit)
+    if len(items) <= limit:
+        return Page(items, None)
+    items = items[:limit]
+    return Page(items, encode_cursor(*(getattr(items[-1], attribute) for attribute in attributes)))
+
+
+def page_size(limit: Optional[int]) -> int:
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
@@ -0,0 +1,238 @@
+"""
+Проверка планов запросов DAO: наполняет базу тестовыми данными внутри транзакции, собирает ANALYZE,
+выполняет EXPLAIN для каждого запроса Database* и падает, если план читает большую таблицу последовательным сканированием.
+Транзакция откатывается, данные в базе не меняются.
+
+    python -m app.db.QueryPlan --users 5000 --threshold 1000
+"""
+import argparse
+import asyncio
+import json
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from app.db.Cache import TTLCache
+from app.db.DAO import DAO
+from app.db.Database.DatabaseAdmin import DatabaseAdmin
+from app.db.Database.DatabaseConfirm import DatabaseConfirm
+from app.db.Database.DatabaseMessage import DatabaseMessage
+from app.db.Database.DatabaseStreak import DatabaseStreak
+from app.db.Database.DatabaseRevokedToken import DatabaseRevokedToken
+from app.db.Database.DatabaseTransaction import DatabaseTransaction
+from app.db.Database.DatabaseUser import DatabaseUser
+from app.db.Database.DatabaseUserSession import DatabaseUserSession
+from app.db.Dialect import upsert_insert
+from app.db.schema import User, UserProfile, UserBalance, Dialogue, DialogueMessage, ConfirmationToken, UserSession
+from app.db.schema.Base import MessageContentType, SenderType, TokenType, TransactionType
+from app.db.schema.Entity.Transaction import Transaction
+
+# Полные выгрузки читают таблицу целиком по определению
+FULL_SCAN_ALLOWED = {"Admin.stream_users", "Admin.stream_transactions", "Transaction.get_admin"}
+
+
+class _EmptyResult:
+    rowcount = 0
+    inserted_primary_key = ()
+
+    @staticmethod
+    def scalar_one_or_none():
+        return 0
+
+    @staticmethod
+    def all():
+        return []
+
+
+class RecordingInstance:
+    """
+    Подменяет DAO для классов Database*: запоминает запросы вместо выполнения
+    """
+
+    # Планы снимаются только в PostgreSQL
+    dialect = "postgresql"
+    user_cache = TTLCache(0, 0)
+
+    def __init__(self):
+        self.statements = []
+
+    def insert(self, model):
+        return upsert_insert(self.dialect, model)
+
+    async def GetSingle(self, stmt, params: dict = None, use_primary: bool = False):
+        self.statements.append((stmt, params))
+        return None
+
+    async def GetAll(self, stmt, params: dict = None, use_primary: bool = False):
+        self.statements.append((stmt, params))
+        return []
+
+    async def GetRows(self, stmt, params: dict = None, use_primary: bool = False):
+        self.statements.append((stmt, params))
+        return []
+
+    async def Stream(self, stmt, params: dict = None, use_primary: bool = False):
+        self.statements.append((stmt, params))
+        return
+        yield
+
+    async def ExecuteNonQuery(self, stmt):
+        self.statements.append((stmt, None))
+        return _EmptyResult()
+
+    async def ExecuteManyNonQuery(self, batches):
+        for stmt, params in batches:
+            self.statements.append((stmt, params[0] if params else None))
+        return [[] for _ in batches]
+
+    async def ExecuteBulkInsert(self, model, rows, returning: bool = True):
+        return [] if returning else 0
+
+    async def ExecuteListNonQueryIgnoreObj(self, db_objects: list):
+        return True
+
+
+def queries(user_id: str, dialogue_id: str, telegram_id: int, email: str) -> list[tuple[str, str, tuple]]:
+    """
+    Вызовы DAO, планы которых проверяются: (класс, метод, аргументы)
+    """
+    return [
+        ("User", "get", (email,)),
+        ("User", "get", (None, user_id)),
+        ("User", "get", (None, None, telegram_id)),
+        ("User", "get_tg_id", (telegram_id,)),
+        ("User", "set_telegram_id", (user_id, telegram_id)),
+        ("User", "update_password", (user_id, "x")),
+        ("User", "set_session_key", (user_id, uuid.uuid4().hex)),
+        ("User", "delete", (user_id,)),
+        ("Confirm", "get", (TokenType.EMAIL_CONFIRMATION, user_id)),
+        ("Confirm", "attempt", (TokenType.EMAIL_CONFIRMATION, user_id, 5)),
+        ("Confirm", "purge_expired", (1000,)),
+        ("UserSession", "purge_idle", (30, 1000)),
+        ("RevokedToken", "purge_expired", (1000,)),
+        ("Message", "get_dialogue", (user_id, dialogue_id)),
+        ("Message", "get_dialogues", (user_id,)),
+        ("Message", "get_messages", (dialogue_id,)),
+        ("Message", "get_dialogues_with_messages", (user_id,)),
+        ("Message", "get_dialogue_summaries", (user_id,)),
+        ("Message", "search", (user_id, "message")),
+        ("Streak", "get", (user_id,)),
+        ("Transaction", "get", (user_id,)),
+        ("Transaction", "get_admin", ()),
+        ("Transaction", "post", (user_id, 1, "check", TransactionType.CREDIT)),
+        ("Transaction", "compact", ()),
+        ("Admin", "get_all_users", ()),
+        ("Admin", "get_transactions", ()),
+        ("Admin", "stream_users", ()),
+        ("Admin", "stream_transactions", ()),
+    ]
+
+
+async def seed(conn, users: int) -> tuple[str, str, int, str]:
+    now = datetime.now()
+    user_rows, profile_rows, balance_rows, dialogue_rows, message_rows, transaction_rows, token_rows, session_rows = \
+        [], [], [], [], [], [], [], []
+    for i in range(users):
+        user_id = uuid.uuid4().hex
+        session_key = uuid.uuid4().hex
+        created_at = now - timedelta(minutes=i)
+        user_rows.append(dict(id=user_id, email=f"user{i}@example.com", password="x", telegram_id=10_000 + i,
+                              session_key=session_key, created_at=created_at))
+        profile_rows.append(dict(user_id=user_id, name=f"user{i}"))
+        balance_rows.append(dict(user_id=user_id, voice_seconds=100))
+        token_rows.append(dict(user_id=user_id, code="x", type_code=TokenType.EMAIL_CONFIRMATION,
+                               created_at=created_at, expires_at=created_at + timedelta(minutes=5)))
+        session_rows.append(dict(session_key=session_key, user_agent="check", create_at=created_at))
+        for d in range(2):
+            dialogue_id = uuid.uuid4().hex
+            dialogue_rows.append(dict(id=dialogue_id, user_id=user_id, name=f"dialogue{d}"))
+            for m in range(5):
+                message_rows.append(dict(dialogue_id=dialogue_id, content_type=MessageContentType.TEXT_MESSAGE,
+                                         sender=SenderType.USER, text=f"message {m}",
+                                         timestamp=created_at + timedelta(seconds=m)))
+        for t in range(3):
+            transaction_rows.append(dict(user_id=user_id, amount=t + 1, description="seed",
+                                         transaction_type=TransactionType.DEBIT,
+                                         created_at=created_at + timedelta(seconds=t)))
+
+    for model, rows in [(User, user_rows), (UserProfile, profile_rows), (UserBalance, balance_rows),
+                        (ConfirmationToken, token_rows), (UserSession, session_rows), (Dialogue, dialogue_rows),
+                        (DialogueMessage, message_rows), (Transaction, transaction_rows)]:
+        await conn.execute(insert(model.__table__), rows)
+    for model in (User, UserProfile, UserBalance, ConfirmationToken, UserSession, Dialogue, DialogueMessage,
+                  Transaction):
+        await conn.execute(text(f'ANALYZE "{model.__tablename__}"'))
+
+    middle = user_rows[users // 2]
+    dialogue_id = next(row["id"] for row in dialogue_rows if row["user_id"] == middle["id"])
+    return middle["id"], dialogue_id, middle["telegram_id"], middle["email"]
+
+
+def seq_scans(plan: dict) -> list[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+async def check(users: int, threshold: int) -> int:
+    dao = DAO()
+    database_classes = {"User": DatabaseUser, "Confirm": DatabaseConfirm, "Message": DatabaseMessage,
+                        "Transaction": DatabaseTransaction, "Admin": DatabaseAdmin, "UserSession": DatabaseUserSession,
+                        "Streak": DatabaseStreak, "RevokedToken": DatabaseRevokedToken}
+    failures = 0
+    async with dao.db_engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            user_id, dialogue_id, telegram_id, email = await seed(conn, users)
+            relation_sizes = dict((await conn.execute(
+                text("SELECT relname, reltuples FROM pg_class WHERE relkind IN ('r', 'p')"))).all())
+
+            for class_name, method, args in queries(user_id, dialogue_id, telegram_id, email):
+                recorder = RecordingInstance()
+                result = getattr(database_classes[class_name](recorder), method)(*args)
+                try:
+                    if hasattr(result, "__anext__"):
+                        async for _ in result:
+                            pass
+                    else:
+                        await result
+                except Exception:
+                    # Запросы уже записаны, пустые результаты заглушки могут не подходить самому методу
+                    pass
+                label = f"{class_name}.{method}"
+                for stmt, params in recorder.statements:
+                    if params:
+                        stmt = stmt.params(params)
+                    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+                    plan = (await conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + sql)).scalar()
+                    if isinstance(plan, str):
+                        plan = json.loads(plan)
+                    large = [relation for relation in seq_scans(plan[0]["Plan"])
+                             if relation_sizes.get(relation, 0) > threshold]
+                    if large and label not in FULL_SCAN_ALLOWED:
+                        failures += 1
+                        print(f"FAIL {label}: Seq Scan on {', '.join(large)}")
+                    else:
+                        print(f"ok   {label}")
+        finally:
+            await transaction.rollback()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN-проверка запросов DAO на последовательные сканирования")
+    parser.add_argument("--users", type=int, default=5000, help="Сколько пользователей создать для проверки")
+    parser.add_argument("--threshold", type=int, default=1000,
+                        help="Начиная с какого числа строк в таблице Seq Scan считается ошибкой")
+    args = parser.parse_args()
+    failures = asyncio.run(check(args.users, args.threshold))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
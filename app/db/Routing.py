@@ -0,0 +1,66 @@
+import itertools
+import logging
+import time
+from asyncio import current_task
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, async_scoped_session
+
+from app.db.Statistics import PoolStatistics, QueryStatistics, StatementCacheStatistics
+
+# Ключ (id пользователя) текущего запроса, по которому запоминаются его собственные записи
+consistency_key: ContextVar[Optional[str]] = ContextVar("consistency_key", default=None)
+
+
+def use_consistency_key(key: Optional[str]):
+    consistency_key.set(key)
+
+
+class DatabaseNode:
+    """
+    Движок базы (основной или реплики) со своей фабрикой сессий и статистикой пула
+    """
+
+    def __init__(self, name: str, engine: AsyncEngine, slow_query_ms: int = 0):
+        self.name = name
+        self.engine = engine
+        self.pool_statistics = PoolStatistics(engine)
+        self.statement_cache = StatementCacheStatistics(engine)
+        self.query_statistics = QueryStatistics(engine, slow_query_ms, logging.getLogger(f"DAO.{name}"))
+        self.Session = async_scoped_session(async_sessionmaker(bind=engine), current_task)
+
+
+class ReplicaRouter:
+    """
+    Выбирает фабрику сессий для чтения: реплики по кругу, либо основную базу,
+    если пользователь текущего запроса недавно сам что-то записал
+    """
+
+    def __init__(self, primary: DatabaseNode, replicas: list[DatabaseNode], read_your_writes_window: float):
+        self.primary = primary
+        self.replicas = replicas
+        self._replicas_cycle = itertools.cycle(replicas) if replicas else None
+        self._window = read_your_writes_window
+        self._last_writes: dict[str, float] = {}
+
+    def read(self, use_primary: bool = False) -> DatabaseNode:
+        if use_primary or self._replicas_cycle is None or self._wrote_recently():
+            return self.primary
+        return next(self._replicas_cycle)
+
+    def record_write(self):
+        key = consistency_key.get()
+        if key is None or self._replicas_cycle is None:
+            return
+        now = time.monotonic()
+        self._last_writes[key] = now
+        if len(self._last_writes) > 10000:
+            self._last_writes = {k: v for k, v in self._last_writes.items() if now - v < self._window}
+
+    def _wrote_recently(self) -> bool:
+        key = consistency_key.get()
+        if key is None:
+            return False
+        last_write = self._last_writes.get(key)
+        return last_write is not None and time.monotonic() - last_write < self._window
@@ -0,0 +1,191 @@
+import hashlib
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class PoolStatistics:
+    """
+    Счётчики пула соединений движка: занятые соединения, переполнение, ожидание соединения и пересоздания
+    """
+
+    def __init__(self, engine: AsyncEngine):
+        self._pool = engine.sync_engine.pool
+        self.connects = 0
+        self.recycled = 0
+        self.invalidated = 0
+        self.checkouts = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        event.listen(engine.sync_engine, "connect", self._on_connect)
+        event.listen(engine.sync_engine, "checkout", self._on_checkout)
+        event.listen(engine.sync_engine, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+        # record_info живёт столько же, сколько слот пула, поэтому повторное подключение слота - это пересоздание
+        if connection_record.record_info.get("connected"):
+            self.recycled += 1
+        connection_record.record_info["connected"] = True
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidated += 1
+
+    def add_wait(self, seconds: float):
+        self.wait_count += 1
+        self.wait_total += seconds
+        if seconds > self.wait_max:
+            self.wait_max = seconds
+
+    def snapshot(self) -> dict:
+        # У StaticPool (SQLite в памяти) одно соединение и нет счётчиков очереди
+        queue_pool = hasattr(self._pool, "size")
+        return {
+            "size": self._pool.size() if queue_pool else 1,
+            "checked_out": self._pool.checkedout() if queue_pool else 0,
+            "checked_in": self._pool.checkedin() if queue_pool else 1,
+            "overflow": max(self._pool.overflow(), 0) if queue_pool else 0,
+            "connects": self.connects,
+            "recycled": self.recycled,
+            "invalidated": self.invalidated,
+            "checkouts": self.checkouts,
+            "wait_avg_ms": self.wait_total / self.wait_count * 1000 if self.wait_count else 0.0,
+            "wait_max_ms": self.wait_max * 1000,
+        }
+
+
+class StatementCacheStatistics:
+    """
+    Попадания и промахи кэша скомпилированных выражений движка
+    """
+
+    def __init__(self, engine: AsyncEngine):
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0
+        event.listen(engine.sync_engine, "after_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        cache_hit = getattr(context, "cache_hit", None)
+        if cache_hit == CACHE_HIT:
+            self.hits += 1
+        elif cache_hit == CACHE_MISS:
+            self.misses += 1
+        else:
+            self.uncached += 1
+
+    def snapshot(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "uncached": self.uncached,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+# Счётчик запросов текущего HTTP-запроса по отпечаткам, заполняется QueryStatistics
+request_statements: ContextVar[Optional[Counter]] = ContextVar("request_statements", default=None)
+
+# Сколько разных отпечатков хранится, остальные учитываются одной строкой
+MAX_FINGERPRINTS = 1000
+OTHER_FINGERPRINT = "other"
+
+
+def statement_fingerprint(statement: str) -> tuple[str, str]:
+    """
+    Приводит запрос к форме без значений: параметры, числа и списки значений (IN, VALUES) заменяются на ?
+    :return: (отпечаток, нормализованный запрос)
+    """
+    normalized = " ".join(statement.split())
+    normalized = re.sub(r"\$\d+|%\(\w+\)s|(?<![\w$.])\d+\b", "?", normalized)
+    normalized = re.sub(r"\?(?:::[\w ]+?)?(?:, \?(?:::[\w ]+?)?)+(?=\))", "?...", normalized)
+    normalized = re.sub(r"\(\?(?:\.\.\.)?\)(?:, \(\?(?:\.\.\.)?\))+", "(?...), ...", normalized)
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16], normalized
+
+
+class QueryStatistics:
+    """
+    Время выполнения и число строк по отпечаткам запросов движка, журнал медленных запросов
+    """
+
+    def __init__(self, engine: AsyncEngine, slow_query_ms: int, logger: logging.Logger):
+        self.slow_query_ms = slow_query_ms
+        self.logger = logger
+        self.statements: dict[str, dict] = {}
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_execute)
+
+    @staticmethod
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        # Начало хранится в контексте выполнения: упавший запрос не вызывает after_cursor_execute,
+        # и его отметка уходит вместе с контекстом, а не копится в соединении
+        context._query_started = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - context._query_started) * 1000
+        fingerprint, normalized = statement_fingerprint(statement)
+        if fingerprint not in self.statements and len(self.statements) >= MAX_FINGERPRINTS:
+            fingerprint, normalized = OTHER_FINGERPRINT, OTHER_FINGERPRINT
+        stats = self.statements.get(fingerprint)
+        if stats is None:
+            stats = self.statements[fingerprint] = {"statement": normalized, "calls": 0, "rows": 0,
+                                                    "total_ms": 0.0, "max_ms": 0.0, "slow": 0}
+        stats["calls"] += 1
+        stats["rows"] += max(cursor.rowcount, 0)
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        if self.slow_query_ms and elapsed_ms >= self.slow_query_ms:
+            stats["slow"] += 1
+            self.logger.warning(f"Медленный запрос {elapsed_ms:.1f} мс [{fingerprint}]: {normalized}")
+
+        counter = request_statements.get()
+        if counter is not None:
+            counter[fingerprint] += 1
+
+    def snapshot(self) -> list[dict]:
+        return [{"fingerprint": fingerprint, **stats,
+                 "avg_ms": stats["total_ms"] / stats["calls"] if stats["calls"] else 0.0}
+                for fingerprint, stats in self.statements.items()]
+
+
+class NPlusOneDetector:
+    """
+    Отмечает HTTP-запросы, которые выполнили один и тот же запрос к базе больше threshold раз
+    """
+
+    def __init__(self, threshold: int, logger: logging.Logger):
+        self.threshold = threshold
+        self.logger = logger
+        self.findings: dict[tuple[str, str], dict] = {}
+
+    @staticmethod
+    def start() -> Counter:
+        counter = Counter()
+        request_statements.set(counter)
+        return counter
+
+    def finish(self, endpoint: str, counter: Counter):
+        request_statements.set(None)
+        for fingerprint, repeats in counter.items():
+            if repeats <= self.threshold:
+                continue
+            finding = self.findings.setdefault((endpoint, fingerprint), {"requests": 0, "max_repeats": 0})
+            finding["requests"] += 1
+            finding["max_repeats"] = max(finding["max_repeats"], repeats)
+            self.logger.warning(f"N+1: {endpoint} выполнил запрос [{fingerprint}] {repeats} раз")
+
+    def snapshot(self) -> list[dict]:
+        return [{"endpoint": endpoint, "fingerprint": fingerprint, **finding}
+                for (endpoint, fingerprint), finding in self.findings.items()]
@@ -0,0 +1,44 @@
+"""add lookup indexes
+
+Revision ID: 4f1c2a9d7b3e
+Revises: 
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f1c2a9d7b3e'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix__user__email", "user", ["email"]),
+    ("ix__user__telegram_id", "user", ["telegram_id"]),
+    ("ix__user__created_at_id", "user", ["created_at", "id"]),
+    ("ix__dialogue__user_id_id", "dialogue", ["user_id", "id"]),
+    ("ix__dialogue_message__dialogue_id_id", "dialogue_message", ["dialogue_id", "id"]),
+    ("ix__transactions__user_id_created_at_id", "transactions", ["user_id", "created_at", "id"]),
+    ("ix__transactions__created_at_id", "transactions", ["created_at", "id"]),
+]
+
+
+def upgrade() -> None:
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            # На пустой базе таблицы создаст следующая автогенерированная ревизия вместе с индексами
+            if table in tables:
+                op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
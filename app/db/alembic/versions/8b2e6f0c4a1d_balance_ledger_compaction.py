@@ -0,0 +1,45 @@
+"""balance ledger compaction
+
+Revision ID: 8b2e6f0c4a1d
+Revises: 4f1c2a9d7b3e
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e6f0c4a1d'
+down_revision: Union[str, None] = '4f1c2a9d7b3e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # На пустой базе таблицу создаст автогенерированная ревизия
+    if "transactions" not in sa.inspect(op.get_bind()).get_table_names():
+        return
+    # Существующие транзакции уже учтены в user_balance.voice_seconds, поэтому отмечаются перенесёнными
+    op.add_column("transactions", sa.Column("compacted", sa.Boolean(), server_default=sa.true(), nullable=False))
+    op.alter_column("transactions", "compacted", server_default=sa.false())
+    with op.get_context().autocommit_block():
+        op.create_index("ix__transactions__user_id_not_compacted", "transactions", ["user_id"],
+                        postgresql_where=sa.text("NOT compacted"), postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    # Снимок должен включать все транзакции, иначе баланс после отката потеряет несжатый остаток
+    op.execute("""
+        UPDATE user_balance SET voice_seconds = user_balance.voice_seconds + delta.seconds
+        FROM (SELECT user_id,
+                     sum(CASE WHEN transaction_type = 'CREDIT' THEN -amount ELSE amount END) AS seconds
+              FROM transactions WHERE NOT compacted GROUP BY user_id) AS delta
+        WHERE user_balance.user_id = delta.user_id
+    """)
+    with op.get_context().autocommit_block():
+        op.drop_index("ix__transactions__user_id_not_compacted", table_name="transactions",
+                      postgresql_concurrently=True, if_exists=True)
+    op.drop_column("transactions", "compacted")
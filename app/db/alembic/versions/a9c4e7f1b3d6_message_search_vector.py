@@ -0,0 +1,55 @@
+"""dialogue_message full-text search vector
+
+Revision ID: a9c4e7f1b3d6
+Revises: f5b2d8c3a6e4
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c4e7f1b3d6'
+down_revision: Union[str, None] = 'f5b2d8c3a6e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX = "ix__dialogue_message__search_vector"
+# Совпадает с SEARCH_DOCUMENT в app.db.schema.Entity.DialogueMessage на момент ревизии
+SEARCH_DOCUMENT = ("to_tsvector('russian'::regconfig, coalesce(text, '')) || "
+                   "to_tsvector('english'::regconfig, coalesce(text, ''))")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # На пустой базе таблицу создаст автогенерированная ревизия
+    if "dialogue_message" not in sa.inspect(bind).get_table_names():
+        return
+    # Сохраняемая генерируемая колонка переписывает таблицу и все её секции
+    op.execute(f"ALTER TABLE dialogue_message ADD COLUMN IF NOT EXISTS search_vector tsvector "
+               f"GENERATED ALWAYS AS ({SEARCH_DOCUMENT}) STORED")
+
+    partitions = bind.execute(sa.text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass('dialogue_message')")).scalars().all()
+    if not partitions:
+        with op.get_context().autocommit_block():
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{INDEX}" '
+                       f"ON dialogue_message USING gin (search_vector)")
+        return
+    # CONCURRENTLY недоступен для секционированной таблицы: индекс родителя создаётся пустым,
+    # индексы секций строятся без блокировки записи и присоединяются к нему
+    op.execute(f'CREATE INDEX IF NOT EXISTS "{INDEX}" ON ONLY dialogue_message USING gin (search_vector)')
+    for partition in partitions:
+        with op.get_context().autocommit_block():
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{partition}_search_vector" '
+                       f'ON "{partition}" USING gin (search_vector)')
+        op.execute(f'ALTER INDEX "{INDEX}" ATTACH PARTITION "{partition}_search_vector"')
+
+
+def downgrade() -> None:
+    op.execute(f'DROP INDEX IF EXISTS "{INDEX}"')
+    op.execute("ALTER TABLE dialogue_message DROP COLUMN IF EXISTS search_vector")
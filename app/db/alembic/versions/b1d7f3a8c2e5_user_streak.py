@@ -0,0 +1,37 @@
+"""user activity streak
+
+Revision ID: b1d7f3a8c2e5
+Revises: a9c4e7f1b3d6
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b1d7f3a8c2e5'
+down_revision: Union[str, None] = 'a9c4e7f1b3d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # На пустой базе таблицы создаст автогенерированная ревизия
+    if "user" not in sa.inspect(op.get_bind()).get_table_names():
+        return
+    # Серии по истории сообщений заполняет Database.migrate после применения ревизий
+    op.create_table(
+        "user_streak",
+        sa.Column("user_id", sa.CHAR(32), nullable=False),
+        sa.Column("current_streak", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("last_active_date", sa.Date(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], name="fk__user_streak__user_id__user", ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", name="pk__user_streak"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("user_streak")
@@ -0,0 +1,36 @@
+"""revoked one-time tokens
+
+Revision ID: c4f9a2d6e8b1
+Revises: b1d7f3a8c2e5
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f9a2d6e8b1'
+down_revision: Union[str, None] = 'b1d7f3a8c2e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # На пустой базе таблицы создаст автогенерированная ревизия
+    if "user" not in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "revoked_token",
+        sa.Column("jti", sa.String(64), nullable=False),
+        sa.Column("expires_at", sa.TIMESTAMP(), nullable=False),
+        sa.PrimaryKeyConstraint("jti", name="pk__revoked_token"),
+    )
+    op.create_index("ix__revoked_token__expires_at", "revoked_token", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix__revoked_token__expires_at", table_name="revoked_token")
+    op.drop_table("revoked_token")
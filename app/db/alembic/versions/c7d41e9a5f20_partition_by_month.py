@@ -0,0 +1,145 @@
+"""partition dialogue_message and transactions by month
+
+Revision ID: c7d41e9a5f20
+Revises: 8b2e6f0c4a1d
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d41e9a5f20'
+down_revision: Union[str, None] = '8b2e6f0c4a1d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Таблица, ключ секционирования
+TABLES = [
+    ("dialogue_message", "timestamp"),
+    ("transactions", "created_at"),
+]
+# Сколько будущих месяцев создать сразу, дальше их создаёт фоновая задача
+MONTHS_AHEAD = 3
+
+
+def add_month(value: datetime) -> datetime:
+    return value.replace(year=value.year + value.month // 12, month=value.month % 12 + 1)
+
+
+def relkind(bind, table: str):
+    return bind.execute(sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"),
+                        {"table": f'"{table}"'}).scalar()
+
+
+def table_definition(bind, table: str) -> dict:
+    inspector = sa.inspect(bind)
+    return {
+        "foreign_keys": inspector.get_foreign_keys(table),
+        "indexes": inspector.get_indexes(table),
+        "sequence": bind.execute(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"),
+                                 {"table": f'"{table}"'}).scalar(),
+    }
+
+
+def rename_constraints(bind, table: str, suffix: str):
+    """
+    Освобождает имена ограничений и индексов, чтобы их заняли объекты новой таблицы
+    """
+    constraints = bind.execute(sa.text("SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:table)"),
+                               {"table": f'"{table}"'}).scalars().all()
+    for name in constraints:
+        op.execute(f'ALTER TABLE "{table}" RENAME CONSTRAINT "{name}" TO "{name}{suffix}"')
+    for index in sa.inspect(bind).get_indexes(table):
+        op.execute(f'ALTER INDEX "{index["name"]}" RENAME TO "{index["name"]}{suffix}"')
+
+
+def recreate_keys(table: str, key: list[str], definition: dict):
+    op.create_primary_key(f"pk__{table}", table, key)
+    for foreign_key in definition["foreign_keys"]:
+        op.create_foreign_key(foreign_key["name"], table, foreign_key["referred_table"],
+                              foreign_key["constrained_columns"], foreign_key["referred_columns"],
+                              ondelete=foreign_key["options"].get("ondelete"))
+    for index in definition["indexes"]:
+        where = index.get("dialect_options", {}).get("postgresql_where")
+        # На секционированной таблице совпадающий индекс секции присоединяется, а не строится заново
+        op.create_index(index["name"], table, index["column_names"],
+                        postgresql_where=sa.text(where) if where else None)
+
+
+def key_index(table: str) -> str:
+    return f"{table}_key"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # На пустой базе секционированные таблицы создаст автогенерированная ревизия
+    tables = [(table, column, table_definition(bind, table)) for table, column in TABLES
+              if relkind(bind, table) == "r"]
+    for table, column, definition in tables:
+        # Индекс от прерванного запуска не переносится на родителя как обычный индекс
+        definition["indexes"] = [index for index in definition["indexes"] if index["name"] != key_index(table)]
+        # Индекс будущего первичного ключа строится без блокировки записи, до переименований.
+        # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+        with op.get_context().autocommit_block():
+            op.execute(f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "{key_index(table)}" '
+                       f'ON "{table}" (id, "{column}")')
+
+    for table, column, definition in tables:
+        legacy = f"{table}_legacy"
+
+        # Существующие строки остаются одной секцией от MINVALUE до начала следующего месяца
+        now = datetime.now()
+        boundary = add_month(now.replace(day=1, hour=0, minute=0, second=0, microsecond=0))
+        latest = bind.execute(sa.text(f'SELECT max("{column}") FROM "{table}"')).scalar()
+        while latest is not None and latest >= boundary:
+            boundary = add_month(boundary)
+
+        op.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+        rename_constraints(bind, legacy, "_legacy")
+        op.execute(f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS) PARTITION BY RANGE ("{column}")')
+        if definition["sequence"]:
+            op.execute(f'ALTER SEQUENCE {definition["sequence"]} OWNED BY "{table}".id')
+
+        # Проверенное ограничение позволяет присоединить секцию без полного просмотра под блокировкой
+        op.execute(f'ALTER TABLE "{legacy}" ADD CONSTRAINT "{legacy}_bound" '
+                   f'CHECK ("{column}" IS NOT NULL AND "{column}" < \'{boundary.isoformat()}\') NOT VALID')
+        op.execute(f'ALTER TABLE "{legacy}" VALIDATE CONSTRAINT "{legacy}_bound"')
+        op.execute(f'ALTER TABLE "{table}" ATTACH PARTITION "{legacy}" '
+                   f'FOR VALUES FROM (MINVALUE) TO (\'{boundary.isoformat()}\')')
+        # Ключи родителя не просматривают секцию под блокировкой: первичный ключ присоединяет готовое
+        # уникальное ограничение, прежние индексы и внешние ключи секции совпадают с новыми и тоже
+        # присоединяются, а SET NOT NULL ключа секционирования доказывается ограничением _bound,
+        # поэтому оно снимается только после ключей
+        op.execute(f'ALTER TABLE "{legacy}" ADD CONSTRAINT "{legacy}_key" '
+                   f'UNIQUE USING INDEX "{key_index(table)}_legacy"')
+        recreate_keys(table, ["id", column], definition)
+        op.execute(f'ALTER TABLE "{legacy}" DROP CONSTRAINT "{legacy}_bound"')
+
+        start = boundary
+        for _ in range(MONTHS_AHEAD + 1):
+            end = add_month(start)
+            op.execute(f'CREATE TABLE IF NOT EXISTS "{table}_p{start:%Y%m}" PARTITION OF "{table}" '
+                       f'FOR VALUES FROM (\'{start.isoformat()}\') TO (\'{end.isoformat()}\')')
+            start = end
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for table, column in reversed(TABLES):
+        if relkind(bind, table) != "p":
+            continue
+        partitioned = f"{table}_partitioned"
+        definition = table_definition(bind, table)
+        op.execute(f'ALTER TABLE "{table}" RENAME TO "{partitioned}"')
+        rename_constraints(bind, partitioned, "_partitioned")
+        op.execute(f'CREATE TABLE "{table}" (LIKE "{partitioned}" INCLUDING DEFAULTS)')
+        op.execute(f'INSERT INTO "{table}" SELECT * FROM "{partitioned}"')
+        if definition["sequence"]:
+            op.execute(f'ALTER SEQUENCE {definition["sequence"]} OWNED BY "{table}".id')
+        op.execute(f'DROP TABLE "{partitioned}" CASCADE')
+        recreate_keys(table, ["id"], definition)
@@ -0,0 +1,33 @@
+"""confirmation code attempts
+
+Revision ID: d2b6e9f4a1c7
+Revises: c4f9a2d6e8b1
+Create Date: 2026-10-19 00:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2b6e9f4a1c7'
+down_revision: Union[str, None] = 'c4f9a2d6e8b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # На пустой базе таблицы создаст автогенерированная ревизия
+    if "confirmation_tokens" not in sa.inspect(op.get_bind()).get_table_names():
+        return
+    # Коды хранились хэшами bcrypt и не проверяются через HMAC, живут они несколько минут
+    op.execute("DELETE FROM confirmation_tokens")
+    op.add_column("confirmation_tokens",
+                  sa.Column("attempts", sa.Integer(), server_default="0", nullable=False))
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM confirmation_tokens")
+    op.drop_column("confirmation_tokens", "attempts")
@@ -0,0 +1,50 @@
+"""dialogue summary columns
+
+Revision ID: f5b2d8c3a6e4
+Revises: e3a9b5c1d8f2
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5b2d8c3a6e4'
+down_revision: Union[str, None] = 'e3a9b5c1d8f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # На пустой базе таблицу создаст автогенерированная ревизия
+    if "dialogue" not in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.add_column("dialogue", sa.Column("message_count", sa.Integer(), server_default="0", nullable=False))
+    op.add_column("dialogue", sa.Column("last_message_id", sa.Integer(), nullable=True))
+    op.add_column("dialogue", sa.Column("last_activity_at", sa.TIMESTAMP(), server_default=sa.func.now(),
+                                        nullable=False))
+    # Сводка существующих диалогов: последнее сообщение по id и общее число сообщений
+    op.execute("""
+        UPDATE dialogue SET message_count = summary.message_count,
+                            last_message_id = summary.id,
+                            last_activity_at = summary.timestamp
+        FROM (SELECT DISTINCT ON (dialogue_id) dialogue_id, id, timestamp,
+                     count(*) OVER (PARTITION BY dialogue_id) AS message_count
+              FROM dialogue_message ORDER BY dialogue_id, id DESC) AS summary
+        WHERE dialogue.id = summary.dialogue_id
+    """)
+    with op.get_context().autocommit_block():
+        op.create_index("ix__dialogue__user_id_last_activity_at_id", "dialogue",
+                        ["user_id", "last_activity_at", "id"], postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix__dialogue__user_id_last_activity_at_id", table_name="dialogue",
+                      postgresql_concurrently=True, if_exists=True)
+    op.drop_column("dialogue", "last_activity_at")
+    op.drop_column("dialogue", "last_message_id")
+    op.drop_column("dialogue", "message_count")
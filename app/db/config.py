@@ -0,0 +1,119 @@
+import os
+from typing import Literal
+
+from sqlalchemy import URL, StaticPool
+from pydantic import BaseModel, ConfigDict, NonNegativeFloat, NonNegativeInt, PositiveFloat, PositiveInt
+
+
+class DatabaseConfig(BaseModel):
+    """
+    Настройки движка и пула соединений. Каждое поле читается из переменной окружения DB_<ИМЯ_ПОЛЯ>
+    """
+    # postgresql - основная база, sqlite - локальные запуски и нагрузочные тесты без PostgreSQL
+    backend: Literal["postgresql", "sqlite"] = "postgresql"
+    # Файл базы SQLite, ":memory:" - база в памяти на одном соединении
+    sqlite_path: str = "delta.sqlite3"
+    pool_size: PositiveInt = 10
+    max_overflow: NonNegativeInt = 10
+    # Время жизни соединения в секундах, -1 отключает пересоздание
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = False
+    # Сколько секунд ждать свободное соединение из пула
+    pool_timeout: NonNegativeFloat = 30
+    # Ограничение времени выполнения одного запроса на стороне PostgreSQL в миллисекундах, 0 - без ограничения
+    statement_timeout: NonNegativeInt = 0
+    # Реплики для чтения через запятую: host[:port],host[:port]
+    replica_hosts: str = ""
+    # Сколько секунд после собственной записи пользователь читает с основной базы
+    read_your_writes_window: NonNegativeFloat = 5
+    # Начиная с какого размера пачки массовая вставка без RETURNING идёт через COPY
+    copy_threshold: PositiveInt = 1000
+    # Сколько строк за раз читается из серверного курсора при потоковой выгрузке
+    stream_batch_size: PositiveInt = 1000
+    # Размер кэша скомпилированных SQLAlchemy выражений на движок
+    compiled_cache_size: NonNegativeInt = 500
+    # Размер кэша подготовленных выражений asyncpg на каждое соединение, 0 отключает кэш
+    prepared_statement_cache_size: NonNegativeInt = 100
+    # Запросы дольше этого времени в миллисекундах пишутся в журнал, 0 отключает журнал
+    slow_query_ms: NonNegativeInt = 500
+    # Сколько раз один и тот же запрос может выполниться за HTTP-запрос, прежде чем это считается N+1
+    n_plus_one_threshold: PositiveInt = 10
+    # Начальная и наибольшая задержка между повторами при ошибке подключения в секундах
+    retry_base_delay: NonNegativeFloat = 0.1
+    retry_max_delay: NonNegativeFloat = 2
+    # Сколько секунд один вызов может повторять попытки подключения
+    retry_deadline: NonNegativeFloat = 10
+    # Сколько ошибок подключения подряд размыкают автомат и через сколько секунд пробовать снова
+    breaker_failure_threshold: PositiveInt = 5
+    breaker_reset_timeout: NonNegativeFloat = 10
+    # Как часто в секундах переносить новые транзакции в снимок баланса, 0 отключает уплотнитель
+    compact_interval: NonNegativeFloat = 60
+    # Сколько транзакций переносится одним запросом
+    compact_batch_size: PositiveInt = 10000
+    # Сколько месяцев вперёд держать созданные секции и как часто это проверять в секундах
+    partition_months_ahead: NonNegativeInt = 3
+    partition_interval: PositiveFloat = 86400
+    # Секции старше стольких месяцев удаляются, 0 - хранить всё
+    partition_retention_months: NonNegativeInt = 0
+    # Как часто в секундах записывать накопленные при входе отметки сессий
+    session_flush_interval: PositiveFloat = 0.3
+    # Сколько отметок сессий держать в буфере и после скольких неудачных записей подряд отбросить буфер
+    session_buffer_size: PositiveInt = 10000
+    session_flush_max_attempts: PositiveInt = 3
+    # Как часто в секундах удалять истёкшие коды подтверждения, использованные токены и неиспользуемые сессии и сколько строк за запрос
+    purge_interval: PositiveFloat = 300
+    purge_batch_size: PositiveInt = 1000
+    # Через сколько дней без входа сессия удаляется
+    session_idle_days: PositiveInt = 30
+    # Кэш пользователя для проверки авторизации: сколько пользователей и сколько секунд хранить, 0 отключает кэш
+    user_cache_size: NonNegativeInt = 10000
+    user_cache_ttl: NonNegativeFloat = 30
+    # Мигрировать базу при старте, если отпечаток схемы не совпал. По умолчанию миграция запускается
+    # отдельно режимом migrate, а старт только сверяет отпечаток
+    migrate_on_boot: bool = False
+    model_config = ConfigDict(extra="ignore")
+
+    @classmethod
+    def from_env(cls, prefix: str = "DB_") -> "DatabaseConfig":
+        values = {}
+        for name in cls.model_fields:
+            value = os.getenv(f"{prefix}{name.upper()}")
+            if value is not None:
+                values[name] = value
+        return cls(**values)
+
+    def replicas(self) -> list[tuple[str, int | None]]:
+        if self.backend != "postgresql":
+            return []
+        replicas = []
+        for replica in filter(None, (host.strip() for host in self.replica_hosts.split(","))):
+            host, _, port = replica.partition(":")
+            replicas.append((host, int(port) if port else None))
+        return replicas
+
+    def url(self, url_object: URL) -> URL:
+        if url_object.get_driver_name() == "asyncpg":
+            return url_object.update_query_dict(
+                {"prepared_statement_cache_size": str(self.prepared_statement_cache_size)})
+        return url_object
+
+    def engine_options(self) -> dict:
+        if self.backend == "sqlite":
+            if self.sqlite_path == ":memory:":
+                # База в памяти существует, пока открыто её единственное соединение
+                return dict(poolclass=StaticPool, query_cache_size=self.compiled_cache_size)
+            return dict(pool_size=self.pool_size,
+                        max_overflow=self.max_overflow,
+                        pool_timeout=self.pool_timeout,
+                        query_cache_size=self.compiled_cache_size,
+                        # Сколько секунд SQLite ждёт снятия блокировки записи другой транзакцией
+                        connect_args={"timeout": self.pool_timeout})
+        options = dict(pool_size=self.pool_size,
+                       max_overflow=self.max_overflow,
+                       pool_recycle=self.pool_recycle,
+                       pool_pre_ping=self.pool_pre_ping,
+                       pool_timeout=self.pool_timeout,
+                       query_cache_size=self.compiled_cache_size)
+        if self.statement_timeout:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(self.statement_timeout)}}
+        return options
@@ -1,6 +1,7 @@
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 
-from sqlalchemy import CHAR, ForeignKey, TEXT, UniqueConstraint
+from sqlalchemy import CHAR, ForeignKey, TEXT, UniqueConstraint, Index, Integer, TIMESTAMP, func
 from sqlalchemy.orm import mapped_column, Mapped, relationship
 
 from app.db.schema.Base import Base
@@ -14,13 +15,26 @@ class Dialogue(Base):
     messages: Mapped[List["DialogueMessage"]] = relationship("DialogueMessage", backref="dialogue", uselist=True, order_by="asc(DialogueMessage.id)")
     name: Mapped[str] = mapped_column(TEXT)
 
-    # last_message: Mapped["DialogueMessage"] = relationship(
-    #     "DialogueMessage",
-    #     order_by=DialogueMessage.timestamp.desc(),
-    #     uselist=False,
-    #     viewonly=True
-    # )
+    # Сводка для списка диалогов, обновляется вместе со вставкой сообщений
+    message_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    last_message_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    # Время последнего сообщения, а до первого сообщения - время создания диалога
+    last_activity_at: Mapped[datetime] = mapped_column(TIMESTAMP, default=func.now(), server_default=func.now())
+
+    # Ключ секционирования в условии позволяет читать последнее сообщение только из его секции
+    last_message: Mapped[Optional["DialogueMessage"]] = relationship(
+        "DialogueMessage",
+        primaryjoin="and_(DialogueMessage.id == foreign(Dialogue.last_message_id), "
+                    "DialogueMessage.timestamp == foreign(Dialogue.last_activity_at))",
+        uselist=False,
+        viewonly=True
+    )
 
     UniqueConstraint(
         'id', 'user_id', name='uq__dialogue_user'
     )
+
+    __table_args__ = (
+        Index("ix__dialogue__user_id_id", "user_id", "id"),
+        Index("ix__dialogue__user_id_last_activity_at_id", "user_id", "last_activity_at", "id"),
+    )
@@ -1,11 +1,20 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import ForeignKey, Enum, INT, TEXT, Boolean, func, CHAR
+from sqlalchemy import ForeignKey, Enum, INT, TEXT, Boolean, func, CHAR, Index, Computed
 from sqlalchemy.dialects.mysql import TIMESTAMP
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import mapped_column, Mapped, relationship
 
-from app.db.schema.Base import Base, SenderType, MessageContentType
+from app.db.schema.Base import Base, SenderType, MessageContentType, LanguageCode
+
+# Конфигурации полнотекстового поиска PostgreSQL для языков пользователей
+SEARCH_CONFIGS = {
+    LanguageCode.ru: "russian",
+    LanguageCode.en: "english",
+}
+SEARCH_DOCUMENT = " || ".join(f"to_tsvector('{config}'::regconfig, coalesce(text, ''))"
+                              for config in SEARCH_CONFIGS.values())
 
 
 class DialogueMessage(Base):
@@ -15,4 +24,14 @@ class DialogueMessage(Base):
     content_type: Mapped[MessageContentType] = mapped_column(Enum(MessageContentType))
     sender: Mapped[SenderType] = mapped_column(Enum(SenderType))
     text: Mapped[Optional[str]] = mapped_column(TEXT, nullable=True)
-    timestamp: Mapped[datetime] = mapped_column(TIMESTAMP, default=func.now())
+    # Ключ секционирования по месяцам входит в первичный ключ, id остаётся уникальным за счёт последовательности
+    timestamp: Mapped[datetime] = mapped_column(TIMESTAMP, default=func.now(), primary_key=True)
+    # Лексемы текста во всех конфигурациях SEARCH_CONFIGS, в обычных выборках не загружается
+    search_vector: Mapped[Optional[str]] = mapped_column(TSVECTOR, Computed(SEARCH_DOCUMENT, persisted=True),
+                                                         deferred=True)
+
+    __table_args__ = (
+        Index("ix__dialogue_message__dialogue_id_id", "dialogue_id", "id"),
+        Index("ix__dialogue_message__search_vector", "search_vector", postgresql_using="gin"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
@@ -0,0 +1,12 @@
+from datetime import datetime
+
+from sqlalchemy import TIMESTAMP, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.schema.Base import Base
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_token"
+    jti: Mapped[str] = mapped_column(String(64), primary_key=True)
+    expires_at: Mapped[datetime] = mapped_column(TIMESTAMP, index=True)
@@ -0,0 +1,14 @@
+from datetime import datetime
+
+from sqlalchemy import CHAR, TIMESTAMP, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.schema.Base import Base
+
+
+class SchemaFingerprint(Base):
+    __tablename__ = "schema_fingerprint"
+    id: Mapped[int] = mapped_column(primary_key=True, default=1)
+    # sha256 описания Base.metadata, к которому мигрирована база
+    fingerprint: Mapped[str] = mapped_column(CHAR(64))
+    applied_at: Mapped[datetime] = mapped_column(TIMESTAMP, default=func.now(), onupdate=func.now())
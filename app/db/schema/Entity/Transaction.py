@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import TEXT, Integer, ForeignKey, TIMESTAMP, func, Enum
+from sqlalchemy import TEXT, Integer, ForeignKey, TIMESTAMP, func, Enum, Index, Boolean, false, case, text
 from datetime import datetime
 from app.db.schema.Base import Base, TransactionType
 
@@ -9,6 +9,24 @@ class Transaction(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[str] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
     amount: Mapped[int] = mapped_column(Integer, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(TIMESTAMP, default=func.now(), nullable=False)
+    # Ключ секционирования по месяцам входит в первичный ключ, id остаётся уникальным за счёт последовательности
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP, default=func.now(), nullable=False, primary_key=True)
     description: Mapped[str] = mapped_column(TEXT, nullable=True)
     transaction_type: Mapped[TransactionType] = mapped_column(Enum(TransactionType), nullable=False)
+    # Сумма уже перенесена в снимок баланса user_balance
+    compacted: Mapped[bool] = mapped_column(Boolean, default=False, server_default=false(), nullable=False)
+
+    __table_args__ = (
+        Index("ix__transactions__user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix__transactions__created_at_id", "created_at", "id"),
+        Index("ix__transactions__user_id_not_compacted", "user_id",
+              postgresql_where=text("NOT compacted"), sqlite_where=text("NOT compacted")),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    @classmethod
+    def signed_amount(cls):
+        """
+        Изменение баланса: пополнение (DEBIT) увеличивает, списание (CREDIT) уменьшает
+        """
+        return case((cls.transaction_type == TransactionType.CREDIT, -cls.amount), else_=cls.amount)
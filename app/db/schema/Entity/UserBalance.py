@@ -1,10 +1,20 @@
-from sqlalchemy import ForeignKey
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import ForeignKey, func, select
+from sqlalchemy.orm import Mapped, mapped_column, column_property
 from app.db.schema.Base import Base
+from app.db.schema.Entity.Transaction import Transaction
 
 
 class UserBalance(Base):
     __tablename__ = 'user_balance'
     user_id: Mapped[str] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
-    voice_seconds: Mapped[int] = mapped_column(default=0)
+    # Снимок баланса: сумма всех транзакций с compacted = true, обновляется только уплотнителем журнала
+    snapshot_seconds: Mapped[int] = mapped_column("voice_seconds", default=0)
 
+
+# Текущий баланс: снимок плюс ещё не перенесённые в него транзакции (читаются по частичному индексу)
+UserBalance.voice_seconds = column_property(
+    UserBalance.snapshot_seconds + select(func.coalesce(func.sum(Transaction.signed_amount()), 0))
+    .where(Transaction.user_id == UserBalance.user_id, ~Transaction.compacted)
+    .correlate_except(Transaction)
+    .scalar_subquery()
+)
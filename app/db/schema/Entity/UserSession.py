@@ -11,7 +11,8 @@ class UserSession(Base):
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     session_key: Mapped[str] = mapped_column(CHAR(32), index=True)
     user_agent: Mapped[str] = mapped_column(VARCHAR(255))
-    create_at: Mapped[datetime] = mapped_column(TIMESTAMP, default=func.now())
+    # Время последнего входа с этой сессии, по нему удаляются неиспользуемые сессии
+    create_at: Mapped[datetime] = mapped_column(TIMESTAMP, default=func.now(), index=True)
 
     __table_args__ = (
         UniqueConstraint("session_key", "user_agent", name="unique_session_user_agent"),
@@ -0,0 +1,15 @@
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import CHAR, ForeignKey, Date, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.schema.Base import Base
+
+
+class UserStreak(Base):
+    __tablename__ = "user_streak"
+    user_id: Mapped[str] = mapped_column(CHAR(32), ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    # Число дней подряд с сообщениями, заканчивающихся last_active_date
+    current_streak: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    last_active_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
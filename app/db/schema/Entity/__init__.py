@@ -8,4 +8,6 @@ from .VoiceInfo import VoiceInfo
 from .Subscription import Subscription
 from .ConfirmationToken import ConfirmationToken
 from .UserBalance import UserBalance
-
+from .SchemaFingerprint import SchemaFingerprint
+from .UserStreak import UserStreak
+from .RevokedToken import RevokedToken
@@ -1,17 +1,26 @@
 from typing import Callable
 
-from passlib.context import CryptContext
-
+from .blacklist import MemoryTokenBlacklist, TOKEN_BLACKLISTS
 from .config import LoadConfig
+from .hashing import PWD_CONTEXT, PasswordHasher
+from .revocation import SessionRevocations
+from .token_cache import VerifiedTokenCache
 
 
 class AuthConfig:
     _secret_key = None
     _tg_secret_key = None
-    _pwd_context: CryptContext = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    _pwd_context = PWD_CONTEXT
     _algorithm = "HS256"
     _access_token_expires = None
     _reset_token_expires = None
+    _stateless_max_age = None
+    _code_secret_key = None
+    code_max_attempts = 5
+    revocations = SessionRevocations(0)
+    token_cache = VerifiedTokenCache(0)
+    blacklist = MemoryTokenBlacklist()
+    hasher = PasswordHasher(0)
     # _refresh_token_expires = None
 
     @classmethod
@@ -24,6 +33,13 @@ class AuthConfig:
             cls._access_token_expires = config.authjwt_access_token_expires
             cls._reset_token_expires = config.authjwt_reset_token_expires
             cls._tg_secret_key = config.tg_authjwt_secret_key
+            cls._stateless_max_age = config.authjwt_stateless_max_age
+            cls._code_secret_key = config.authjwt_code_secret_key or config.authjwt_secret_key
+            cls.code_max_attempts = config.authjwt_code_max_attempts
+            cls.revocations = SessionRevocations(config.authjwt_stateless_max_age.total_seconds())
+            cls.token_cache = VerifiedTokenCache(config.authjwt_token_cache_size)
+            cls.blacklist = TOKEN_BLACKLISTS[config.authjwt_blacklist_backend]()
+            cls.hasher = PasswordHasher(config.authjwt_hash_workers)
             # cls._refresh_token_expires = config.authjwt_refresh_token_expires
         except Exception as e:
             print("Error loading config: ", e)
@@ -1,7 +1,9 @@
+import hashlib
+import hmac
 import uuid
 from calendar import timegm
 from datetime import datetime, timezone
-from typing import Annotated
+from typing import Annotated, Optional
 
 from fastapi import HTTPException
 from fastapi.params import Depends
@@ -12,13 +14,13 @@ from starlette import status
 from .auth_config import AuthConfig
 from .exceptions import AuthenticateUserError, ValidateCredentialsError, UserNotFound
 from ..db.DAO import DAO
+from ..db.Routing import use_consistency_key
 from ..db.schema.Base import TokenType, Role
-from ..rest.Authentication.entity import TokensResponse, TokenData, RefreshTokenRequest
+from ..rest.Authentication.entity import TokensResponse, TokenData, RefreshTokenRequest, Principal
 from ..rest.User.entity import User
 
 
 class AuthJWT(AuthConfig):
-    blacklist = set()
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/user/login")
 
     @classmethod
@@ -26,7 +28,7 @@ class AuthJWT(AuthConfig):
         user = await DAO().User.get(email)
         if user:
             if user.password != "":
-                if cls.verify_value(password, user.password):
+                if await cls.verify_value_async(password, user.password):
                     return user
         raise AuthenticateUserError(status_code=status.HTTP_401_UNAUTHORIZED,
                                     detail="Incorrect username or password", )
@@ -39,11 +41,33 @@ class AuthJWT(AuthConfig):
     def verify_value(cls, plain_password, hashed_password):
         return cls._pwd_context.verify(plain_password, hashed_password)
 
+    @classmethod
+    def sign_code(cls, user_id: str, code, token_type: TokenType) -> str:
+        """
+        HMAC короткого кода подтверждения. Код живёт минуты и проверяется ограниченное число раз,
+        поэтому медленный bcrypt ему не нужен. Пользователь и вид кода входят в подпись
+        """
+        message = f"{token_type.value}:{user_id}:{code}".encode()
+        return hmac.new(cls._code_secret_key.encode(), message, hashlib.sha256).hexdigest()
+
+    @classmethod
+    def verify_code(cls, user_id: str, code, token_type: TokenType, signature: str) -> bool:
+        return hmac.compare_digest(cls.sign_code(user_id, code, token_type), signature)
+
+    @classmethod
+    async def hash_value_async(cls, password) -> str:
+        return await cls.hasher.hash(password)
+
+    @classmethod
+    async def verify_value_async(cls, plain_password, hashed_password) -> bool:
+        return await cls.hasher.verify(plain_password, hashed_password)
+
     @classmethod
     def create_token(cls, data: dict, token_type: TokenType):
         to_encode = data.copy()
         to_encode["type"] = token_type.value
         if token_type == TokenType.ACCESS_TOKEN:
+            to_encode["iat"] = datetime.now(timezone.utc)
             to_encode["exp"] = datetime.now(timezone.utc) + cls._access_token_expires
         elif token_type in (TokenType.CODE_CONFIRMATION, TokenType.PASSWORD_RESET):
             to_encode["exp"] = datetime.now(timezone.utc) + cls._reset_token_expires
@@ -61,16 +85,31 @@ class AuthJWT(AuthConfig):
         return uuid.uuid4().hex
 
     @classmethod
-    async def set_session_key(cls, user_id: str, session_key: str = generate_session_key()):
+    async def set_session_key(cls, user_id: str, session_key: Optional[str] = None):
+        session_key = session_key or cls.generate_session_key()
         result = await DAO().User.set_session_key(user_id, session_key)
         if result.rowcount == 0:
             return False
+        cls.revocations.revoke(user_id)
         return session_key
 
+    @classmethod
+    def trusts_session(cls, token_data: TokenData) -> bool:
+        """
+        Свежему access-токену доверяют без базы, если ключ сессии пользователя не менялся после его выпуска.
+        Смена ключа в другом процессе здесь не видна, поэтому срок доверия короткий
+        """
+        if not cls._stateless_max_age or token_data.issued_at is None:
+            return False
+        age = timegm(datetime.now(timezone.utc).utctimetuple()) - token_data.issued_at
+        return 0 <= age <= cls._stateless_max_age.total_seconds() \
+            and not cls.revocations.is_revoked(token_data.user_id, token_data.issued_at)
+
 
 async def validate_token(token: Annotated[str, Depends(AuthJWT.oauth2_scheme)]):
     try:
-        payload = jwt.decode(token, AuthJWT._secret_key, algorithms=AuthJWT._algorithm, options={"verify_exp": False})
+        payload = AuthJWT.token_cache.decode("access", token, lambda value: jwt.decode(
+            value, AuthJWT._secret_key, algorithms=AuthJWT._algorithm, options={"verify_exp": False}))
         user_id = payload.get("sub")
         session_key = payload.get("sid")
         token_type = TokenType(payload.get("type"))
@@ -85,15 +124,15 @@ async def validate_token(token: Annotated[str, Depends(AuthJWT.oauth2_scheme)]):
 
         if token_type == TokenType.PASSWORD_RESET:
             jti = payload.get("jti")
-            if jti in AuthJWT.blacklist:
+            if jti is None or not await AuthJWT.blacklist.consume(jti, exp):
                 raise ValidateCredentialsError()
-            AuthJWT.blacklist.add(jti)
             return TokenData(user_id=user_id, session_key=session_key, token_type=token_type)
 
         if None in (user_id, session_key, token_type):
             raise ValidateCredentialsError()
 
-        return TokenData(user_id=user_id, session_key=session_key, token_type=token_type)
+        return TokenData(user_id=user_id, session_key=session_key, token_type=token_type,
+                         issued_at=payload.get("iat"))
 
     except JWTError:
         raise ValidateCredentialsError()
@@ -101,7 +140,8 @@ async def validate_token(token: Annotated[str, Depends(AuthJWT.oauth2_scheme)]):
 
 async def tg_validate_token(token: Annotated[str, Depends(AuthJWT.oauth2_scheme)]) -> int:
     try:
-        payload = jwt.decode(token, AuthJWT._tg_secret_key, algorithms=AuthJWT._algorithm, options={"verify_exp": False})
+        payload = AuthJWT.token_cache.decode("tg", token, lambda value: jwt.decode(
+            value, AuthJWT._tg_secret_key, algorithms=AuthJWT._algorithm, options={"verify_exp": False}))
         tg_id = payload.get("tg_id")
 
         try:
@@ -123,8 +163,24 @@ async def get_token(token: Annotated[str, Depends(AuthJWT.oauth2_scheme)]):
     return token
 
 
-async def get_user(user_id: str, session_key: str) -> User:
+async def get_user(user_id: str) -> User:
+    """
+    Полный пользователь с профилем и балансом из базы, для обработчиков, которые их читают.
+    Сессию, блокировку и роль проверяют зависимости get_current_* по кэшу
+    """
+    use_consistency_key(user_id)
     user = await DAO().User.get(user_id=user_id)
+    if user is None:
+        raise UserNotFound()
+    return user
+
+
+async def get_session_user(user_id: str, session_key: str):
+    """
+    Проверка сессии по кэшированным полям авторизации, без профиля и баланса
+    """
+    use_consistency_key(user_id)
+    user = await DAO().User.get_cached(user_id)
     if user is None:
         raise UserNotFound()
     if user.session_key != session_key:
@@ -136,14 +192,25 @@ async def get_refresh_token(token: RefreshTokenRequest):
     token_data = await validate_token(token.refresh_token)
     if token_data.token_type != TokenType.REFRESH_TOKEN:
         raise ValidateCredentialsError(status_code=status.HTTP_400_BAD_REQUEST, detail="Wrong token type")
-    await get_current_active_user(await get_user(token_data.user_id, token_data.session_key))
+    await get_current_active_user(await get_session_user(token_data.user_id, token_data.session_key))
     return token_data
 
 
 async def get_current_user(token_data: Annotated[TokenData, Depends(validate_token)]):
     if token_data.token_type != TokenType.ACCESS_TOKEN:
         raise ValidateCredentialsError(status_code=status.HTTP_400_BAD_REQUEST, detail="Wrong token type")
-    return await get_user(token_data.user_id, token_data.session_key)
+    return await get_session_user(token_data.user_id, token_data.session_key)
+
+
+async def get_current_principal(token_data: Annotated[TokenData, Depends(validate_token)]) -> Principal:
+    """
+    Только id пользователя: по свежему токену без обращения к базе, иначе с полной проверкой пользователя
+    """
+    if token_data.token_type != TokenType.ACCESS_TOKEN:
+        raise ValidateCredentialsError(status_code=status.HTTP_400_BAD_REQUEST, detail="Wrong token type")
+    if not AuthJWT.trusts_session(token_data):
+        await get_current_active_user(await get_session_user(token_data.user_id, token_data.session_key))
+    return Principal(id=token_data.user_id, session_key=token_data.session_key)
 
 
 async def get_current_active_user(current_user: Annotated[User, Depends(get_current_user)]):
@@ -0,0 +1,46 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from ..db.DAO import DAO
+
+
+class MemoryTokenBlacklist:
+    """
+    Использованные одноразовые токены в памяти процесса, для одного процесса и локальных запусков.
+    Токены одного вида живут одинаково, поэтому порядок вставки совпадает с порядком истечения
+    """
+
+    def __init__(self):
+        self._used: OrderedDict[str, float] = OrderedDict()
+
+    async def consume(self, jti: str, exp: float) -> bool:
+        """
+        :return: False, если токен уже был использован
+        """
+        now = time.time()
+        while self._used and next(iter(self._used.values())) < now:
+            self._used.popitem(last=False)
+        if jti in self._used:
+            return False
+        self._used[jti] = exp
+        return True
+
+    def __len__(self) -> int:
+        return len(self._used)
+
+
+class DatabaseTokenBlacklist:
+    """
+    Использованные одноразовые токены в базе, общие для всех процессов. Истёкшие записи удаляет фоновая задача
+    """
+
+    async def consume(self, jti: str, exp: float) -> bool:
+        # expires_at хранится в UTC без часового пояса, очистка сравнивает с тем же UTC-временем приложения
+        return await DAO().RevokedToken.consume(jti, datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None))
+
+
+TOKEN_BLACKLISTS = {
+    "memory": MemoryTokenBlacklist,
+    "database": DatabaseTokenBlacklist,
+}
@@ -1,4 +1,5 @@
 from datetime import timedelta
+from typing import Literal
 
 from pydantic import BaseModel, StrictStr, StrictInt, StrictBool, ConfigDict
 
@@ -9,5 +10,19 @@ class LoadConfig(BaseModel):
     authjwt_algorithm: StrictStr | None = "HS256"
     authjwt_access_token_expires: StrictBool | StrictInt | timedelta | None = timedelta(minutes=600)
     authjwt_reset_token_expires: StrictBool | StrictInt | timedelta | None = timedelta(minutes=5)
+    # Access-токену не старше этого доверяют без сверки ключа сессии с базой, 0 отключает.
+    # Отзыв сессии виден только в процессе, который его выполнил: в других воркерах выход, удаление
+    # или блокировка пользователя вступают в силу не позже чем через это время
+    authjwt_stateless_max_age: timedelta = timedelta(seconds=60)
+    # Проверенных токенов в кэше, 0 отключает кэш
+    authjwt_token_cache_size: StrictInt = 10000
+    # Где хранить использованные токены сброса пароля: database - общий для всех процессов, memory - один процесс
+    authjwt_blacklist_backend: Literal["database", "memory"] = "database"
+    # Процессов для bcrypt, столько же хэшей вычисляется одновременно, 0 - хэшировать в пуле потоков
+    authjwt_hash_workers: StrictInt = 2
+    # Ключ HMAC кодов подтверждения, по умолчанию authjwt_secret_key
+    authjwt_code_secret_key: StrictStr | None = None
+    # Сколько раз можно ввести код подтверждения, прежде чем придётся запросить новый
+    authjwt_code_max_attempts: StrictInt = 5
     # authjwt_refresh_token_expires: StrictBool | StrictInt | timedelta | None = timedelta(days=30)
     model_config = ConfigDict(str_min_length=1, str_strip_whitespace=True)
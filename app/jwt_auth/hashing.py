@@ -0,0 +1,96 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+from passlib.context import CryptContext
+
+PWD_CONTEXT = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash(value: str) -> str:
+    return PWD_CONTEXT.hash(value)
+
+
+def _verify(plain_value: str, hashed_value: str) -> bool:
+    return PWD_CONTEXT.verify(plain_value, hashed_value)
+
+
+class PasswordHasher:
+    """
+    bcrypt в отдельных процессах, чтобы хэширование не останавливало цикл событий.
+    Одновременно выполняется не больше workers вызовов, остальные ждут своей очереди в цикле событий,
+    где время ожидания и измеряется. При workers=0 вызовы без ограничения уходят в пул потоков asyncio
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Пул потоков ограничен сам, поэтому семафор нужен только процессам
+        self._semaphore: Optional[asyncio.Semaphore] = asyncio.Semaphore(workers) if workers else None
+        self.calls = 0
+        self.failures = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.queue_seconds = 0.0
+        self.queue_max_seconds = 0.0
+        self.run_seconds = 0.0
+        self.run_max_seconds = 0.0
+
+    def hash(self, value: str):
+        return self._submit(_hash, value)
+
+    def verify(self, plain_value: str, hashed_value: str):
+        return self._submit(_verify, plain_value, hashed_value)
+
+    async def _submit(self, func: Callable, *args):
+        queued = time.perf_counter()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            if self._semaphore is not None:
+                await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        started = time.perf_counter()
+        if not self.workers:
+            future = asyncio.ensure_future(asyncio.to_thread(func, *args))
+        else:
+            if self._executor is None:
+                # Процессы создаются при первом вызове, а не при импорте
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            future = asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        future.add_done_callback(functools.partial(self._finished, queued, started))
+        # Отмена вызывающего не отменяет уже отправленный вызов: слот освобождается, когда он действительно завершится
+        return await asyncio.shield(future)
+
+    def _finished(self, queued: float, started: float, future: asyncio.Future):
+        if self._semaphore is not None:
+            self._semaphore.release()
+        finished = time.perf_counter()
+        self.calls += 1
+        if future.cancelled() or future.exception() is not None:
+            self.failures += 1
+        self.queue_seconds += started - queued
+        self.queue_max_seconds = max(self.queue_max_seconds, started - queued)
+        self.run_seconds += finished - started
+        self.run_max_seconds = max(self.run_max_seconds, finished - started)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def snapshot(self) -> dict:
+        return {
+            "workers": self.workers,
+            "calls": self.calls,
+            "failures": self.failures,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "queue_avg_ms": self.queue_seconds / self.calls * 1000 if self.calls else 0.0,
+            "queue_max_ms": self.queue_max_seconds * 1000,
+            "run_avg_ms": self.run_seconds / self.calls * 1000 if self.calls else 0.0,
+            "run_max_ms": self.run_max_seconds * 1000,
+        }
@@ -0,0 +1,35 @@
+import time
+from collections import OrderedDict
+
+
+class SessionRevocations:
+    """
+    Пользователи, сменившие ключ сессии за последние window секунд.
+    Токен, выпущенный до смены ключа, больше не проходит проверку без базы.
+    Окно не меньше возраста токенов, которым доверяют без базы, поэтому более старые записи не нужны
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self._rotated: OrderedDict[str, float] = OrderedDict()
+
+    def revoke(self, user_id: str):
+        now = time.time()
+        self._rotated[user_id] = now
+        self._rotated.move_to_end(user_id)
+        self._prune(now)
+
+    def is_revoked(self, user_id: str, issued_at: float) -> bool:
+        rotated_at = self._rotated.get(user_id)
+        # iat округлён до секунды, поэтому токен той же секунды считается выпущенным до смены
+        return rotated_at is not None and issued_at <= rotated_at
+
+    def _prune(self, now: float):
+        while self._rotated:
+            user_id, rotated_at = next(iter(self._rotated.items()))
+            if rotated_at >= now - self.window:
+                break
+            del self._rotated[user_id]
+
+    def __len__(self) -> int:
+        return len(self._rotated)
@@ -0,0 +1,73 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Callable
+
+
+class VerifiedTokenCache:
+    """
+    Проверенные полезные нагрузки JWT по sha256 токена. Запись живёт до exp токена,
+    токены без exp не кэшируются. Считает время проверки подписи для настройки горячего пути
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[tuple[str, bytes], tuple[float, dict]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.decode_seconds = 0.0
+        self.decode_max_seconds = 0.0
+
+    def decode(self, kind: str, token: str, decoder: Callable[[str], dict]) -> dict:
+        """
+        :param kind: вид токена, у видов разные ключи подписи
+        :param decoder: проверяет подпись и возвращает полезную нагрузку, при ошибке бросает исключение
+        :return: полезная нагрузка, общая для всех запросов с этим токеном и не изменяемая
+        """
+        key = (kind, hashlib.sha256(token.encode()).digest())
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._entries[key]
+            self.expirations += 1
+
+        self.misses += 1
+        started = time.perf_counter()
+        try:
+            payload = decoder(token)
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.decode_seconds += elapsed
+            self.decode_max_seconds = max(self.decode_max_seconds, elapsed)
+        exp = payload.get("exp")
+        if self.max_size and isinstance(exp, (int, float)) and exp > time.time():
+            self._entries[key] = (exp, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return payload
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "failures": self.failures,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "decode_avg_ms": self.decode_seconds / self.misses * 1000 if self.misses else 0.0,
+            "decode_max_ms": self.decode_max_seconds * 1000,
+        }
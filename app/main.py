@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 import logging
 
@@ -16,5 +17,17 @@ async def main() -> None:
     await server.serve()
 
 
+async def migrate() -> None:
+    await DAO().migrate()
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    launch_modes = {
+        'rest': main,
+        'migrate': migrate
+    }
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--custom_run_mode', choices=launch_modes, default='rest',
+                        help='rest - запуск API, migrate - миграция базы данных')
+    args = parser.parse_args()
+    asyncio.run(launch_modes[args.custom_run_mode]())
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Optional
 
 from pydantic import BaseModel
 
@@ -20,3 +21,124 @@ class UserDetailsResponse(UsersResponse, TransactionsResponse):
 
 class AdminTransactionRequest(BaseModel):
     user_id: str
+
+
+class PoolStatisticsResponse(BaseModel):
+    size: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    connects: int
+    recycled: int
+    invalidated: int
+    checkouts: int
+    wait_avg_ms: float
+    wait_max_ms: float
+
+
+class StatementCacheResponse(BaseModel):
+    hits: int
+    misses: int
+    uncached: int
+    hit_ratio: float
+
+
+class DatabasePoolsResponse(BaseModel):
+    primary: PoolStatisticsResponse
+    replicas: dict[str, PoolStatisticsResponse]
+
+
+class CircuitBreakerResponse(BaseModel):
+    state: str
+    consecutive_failures: int
+    opened: int
+    rejected: int
+    retries: int
+    deadline_exceeded: int
+
+
+class QueryStatisticsResponse(BaseModel):
+    fingerprint: str
+    statement: str
+    calls: int
+    rows: int
+    total_ms: float
+    avg_ms: float
+    max_ms: float
+    slow: int
+
+
+class NPlusOneResponse(BaseModel):
+    endpoint: str
+    fingerprint: str
+    requests: int
+    max_repeats: int
+
+
+class QueryReportResponse(BaseModel):
+    statements: dict[str, list[QueryStatisticsResponse]]
+    n_plus_one: list[NPlusOneResponse]
+
+
+class JobResponse(BaseModel):
+    name: str
+    interval: float
+    runs: int
+    failures: int
+    processed: int
+    last_processed: Optional[int]
+    last_run_at: Optional[datetime]
+    last_duration_ms: float
+    last_error: Optional[str]
+
+
+class CacheResponse(BaseModel):
+    size: int
+    max_size: int
+    ttl: float
+    hits: int
+    misses: int
+    coalesced: int
+    evictions: int
+    expirations: int
+    invalidations: int
+    hit_ratio: float
+
+
+class TokenCacheResponse(BaseModel):
+    size: int
+    max_size: int
+    hits: int
+    misses: int
+    failures: int
+    evictions: int
+    expirations: int
+    hit_ratio: float
+    decode_avg_ms: float
+    decode_max_ms: float
+
+
+class HashPoolResponse(BaseModel):
+    workers: int
+    calls: int
+    failures: int
+    waiting: int
+    max_waiting: int
+    queue_avg_ms: float
+    queue_max_ms: float
+    run_avg_ms: float
+    run_max_ms: float
+
+
+class PartitionResponse(BaseModel):
+    table: str
+    name: str
+    start: Optional[datetime]
+    end: Optional[datetime]
+    rows: int
+
+
+class DetachPartitionsRequest(BaseModel):
+    table: str
+    before: datetime
+    drop: bool = False
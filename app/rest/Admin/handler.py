@@ -0,0 +1,37 @@
+import csv
+import io
+from enum import Enum
+from typing import AsyncIterator, Callable, Literal
+
+from pydantic import BaseModel
+
+ExportFormat = Literal["ndjson", "csv"]
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+async def export_rows(rows: AsyncIterator, to_model: Callable[..., BaseModel],
+                      export_format: ExportFormat) -> AsyncIterator[str]:
+    """
+    Построчно сериализует поток объектов базы в NDJSON или CSV
+    """
+    if export_format == "ndjson":
+        async for row in rows:
+            yield to_model(row).model_dump_json() + "\n"
+        return
+
+    buffer = io.StringIO()
+    writer = None
+    async for row in rows:
+        model = to_model(row)
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(type(model).model_fields))
+            writer.writeheader()
+        writer.writerow({key: value.value if isinstance(value, Enum) else value
+                         for key, value in model.model_dump().items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
@@ -1,14 +1,21 @@
-from typing import Annotated
+from typing import Annotated, Literal
 
-from fastapi import HTTPException
+from fastapi import HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from fastapi.params import Depends
 
 from app.rest.CustomAPIRouter import APIRouter
-from .entity import UsersResponse, UserDetailsResponse
+from app.rest.Pagination import PageParams, set_next_cursor
+from .handler import ExportFormat, EXPORT_MEDIA_TYPES, export_rows
+from .entity import UsersResponse, UserDetailsResponse, PoolStatisticsResponse, DatabasePoolsResponse, \
+    StatementCacheResponse, CircuitBreakerResponse, QueryReportResponse, JobResponse, PartitionResponse, \
+    DetachPartitionsRequest, CacheResponse, TokenCacheResponse, \
+    HashPoolResponse
 from ..Transaction.entity import TransactionResponse
 from ...db.DAO import DAO
+from ...db.Database.DatabasePartition import partitioned_tables
 from ...db.schema.Entity import User as UserBase
-from ...jwt_auth.auth_jwt import get_admin_user
+from ...jwt_auth.auth_jwt import AuthJWT, get_admin_user
 
 
 class Admin:
@@ -19,15 +26,38 @@ class Admin:
         self.route.add_api_route("/users/{user_id}", self.get_user_profile, methods=["GET"])
         self.route.add_api_route("/add_transaction", self.create_transaction, methods=["POST"])
         self.route.add_api_route("/transactions", self.read_transactions, methods=["GET"])
+        self.route.add_api_route("/export/users", self.export_users, methods=["GET"])
+        self.route.add_api_route("/export/transactions", self.export_transactions, methods=["GET"])
+        self.route.add_api_route("/db/pool", self.read_pool_statistics, methods=["GET"],
+                                 response_model=DatabasePoolsResponse)
+        self.route.add_api_route("/db/statement_cache", self.read_statement_cache_statistics, methods=["GET"],
+                                 response_model=dict[str, StatementCacheResponse])
+        self.route.add_api_route("/db/breaker", self.read_circuit_breaker, methods=["GET"],
+                                 response_model=CircuitBreakerResponse)
+        self.route.add_api_route("/db/queries", self.read_query_statistics, methods=["GET"],
+                                 response_model=QueryReportResponse)
+        self.route.add_api_route("/jobs", self.read_jobs, methods=["GET"], response_model=list[JobResponse])
+        self.route.add_api_route("/cache/users", self.read_user_cache, methods=["GET"], response_model=CacheResponse)
+        self.route.add_api_route("/cache/tokens", self.read_token_cache, methods=["GET"],
+                                 response_model=TokenCacheResponse)
+        self.route.add_api_route("/auth/hashing", self.read_hash_pool, methods=["GET"],
+                                 response_model=HashPoolResponse)
+        self.route.add_api_route("/db/partitions", self.read_partitions, methods=["GET"],
+                                 response_model=list[PartitionResponse])
+        self.route.add_api_route("/db/partitions/detach", self.detach_partitions, methods=["POST"],
+                                 response_model=list[str])
 
     @staticmethod
-    async def get_all_users(current_user: Annotated[UserBase, Depends(get_admin_user)]):
-        users = await DAO().Admin.get_all_users()
+    async def get_all_users(current_user: Annotated[UserBase, Depends(get_admin_user)],
+                            page_params: Annotated[PageParams, Depends()],
+                            http_response: Response):
+        users = await DAO().Admin.get_all_users(page_params.limit, page_params.after)
+        set_next_cursor(http_response, users)
         response = {
             "users": []
         }
 
-        for user in users:
+        for user in users.items:
             response["users"].append(
                 UsersResponse(id=user.id, email=user.email, created_at=user.created_at, name=user.profile.name,
                               balance=user.balance.voice_seconds, role=user.role)
@@ -37,16 +67,22 @@ class Admin:
 
     @staticmethod
     async def get_user_profile(current_user: Annotated[UserBase, Depends(get_admin_user)],
-                               user_id: str):
+                               user_id: str,
+                               page_params: Annotated[PageParams, Depends()],
+                               response: Response):
+        """
+        Пользователь и страница его транзакций, следующая страница - по курсору из заголовка X-Next-Cursor
+        """
         user = await DAO().User.get(user_id=user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
         user = UsersResponse(id=user.id, email=user.email, created_at=user.created_at, name=user.profile.name,
                              balance=user.balance.voice_seconds, role=user.role)
-        transactions = await DAO().Transaction.get(current_user.id)
-        response = [TransactionResponse(**transaction.__dict__) for transaction in transactions]
-        if user:
-            return UserDetailsResponse(**user.model_dump(), transactions=response)
-
-        raise HTTPException(status_code=404, detail="User not found")
+        transactions = await DAO().Transaction.get(user_id, page_params.limit, page_params.after)
+        set_next_cursor(response, transactions)
+        return UserDetailsResponse(**user.model_dump(),
+                                   transactions=[TransactionResponse(**transaction.__dict__)
+                                                 for transaction in transactions.items])
 
     @staticmethod
     async def create_transaction(current_user: Annotated[UserBase, Depends(get_admin_user)],
@@ -56,7 +92,92 @@ class Admin:
         return 200
 
     @staticmethod
-    async def read_transactions(current_user: Annotated[UserBase, Depends(get_admin_user)]):
-        transactions = await DAO().Admin.get_transactions()
-        response = [TransactionResponse(**transaction.__dict__) for transaction in transactions]
+    async def read_transactions(current_user: Annotated[UserBase, Depends(get_admin_user)],
+                                page_params: Annotated[PageParams, Depends()],
+                                http_response: Response):
+        transactions = await DAO().Admin.get_transactions(page_params.limit, page_params.after)
+        set_next_cursor(http_response, transactions)
+        response = [TransactionResponse(**transaction.__dict__) for transaction in transactions.items]
         return response
+
+    @staticmethod
+    async def export_users(current_user: Annotated[UserBase, Depends(get_admin_user)],
+                           export_format: Annotated[ExportFormat, Query(alias="format")] = "ndjson"):
+        def to_model(user: UserBase) -> UsersResponse:
+            return UsersResponse(id=user.id, email=user.email, created_at=user.created_at, name=user.profile.name,
+                                 balance=user.balance.voice_seconds, role=user.role)
+
+        return StreamingResponse(export_rows(DAO().Admin.stream_users(), to_model, export_format),
+                                 media_type=EXPORT_MEDIA_TYPES[export_format],
+                                 headers={"Content-Disposition": f"attachment; filename=users.{export_format}"})
+
+    @staticmethod
+    async def export_transactions(current_user: Annotated[UserBase, Depends(get_admin_user)],
+                                  export_format: Annotated[ExportFormat, Query(alias="format")] = "ndjson"):
+        def to_model(transaction) -> TransactionResponse:
+            return TransactionResponse(**transaction.__dict__)
+
+        return StreamingResponse(export_rows(DAO().Admin.stream_transactions(), to_model, export_format),
+                                 media_type=EXPORT_MEDIA_TYPES[export_format],
+                                 headers={"Content-Disposition": f"attachment; filename=transactions.{export_format}"})
+
+    @staticmethod
+    async def read_pool_statistics(current_user: Annotated[UserBase, Depends(get_admin_user)]):
+        router = DAO().router
+        return DatabasePoolsResponse(
+            primary=PoolStatisticsResponse(**router.primary.pool_statistics.snapshot()),
+            replicas={replica.name: PoolStatisticsResponse(**replica.pool_statistics.snapshot())
+                      for replica in router.replicas}
+        )
+
+    @staticmethod
+    async def read_statement_cache_statistics(current_user: Annotated[UserBase, Depends(get_admin_user)]):
+        router = DAO().router
+        return {node.name: StatementCacheResponse(**node.statement_cache.snapshot())
+                for node in [router.primary, *router.replicas]}
+
+    @staticmethod
+    async def read_circuit_breaker(current_user: Annotated[UserBase, Depends(get_admin_user)]):
+        return CircuitBreakerResponse(**DAO().breaker.snapshot())
+
+    @staticmethod
+    async def read_query_statistics(current_user: Annotated[UserBase, Depends(get_admin_user)],
+                                    order: Literal["total_ms", "avg_ms", "max_ms", "calls", "rows"] = "total_ms",
+                                    limit: Annotated[int, Query(ge=1, le=1000)] = 50):
+        router = DAO().router
+        statements = {}
+        for node in [router.primary, *router.replicas]:
+            snapshot = sorted(node.query_statistics.snapshot(), key=lambda stats: stats[order], reverse=True)
+            statements[node.name] = snapshot[:limit]
+        n_plus_one = sorted(DAO().n_plus_one.snapshot(), key=lambda finding: finding["requests"], reverse=True)
+        return QueryReportResponse(statements=statements, n_plus_one=n_plus_one)
+
+    @staticmethod
+    async def read_jobs(current_user: Annotated[UserBase, Depends(get_admin_user)]):
+        return [JobResponse(**job) for job in DAO().jobs.snapshot()]
+
+    @staticmethod
+    async def read_user_cache(current_user: Annotated[UserBase, Depends(get_admin_user)]):
+        return CacheResponse(**DAO().user_cache.snapshot())
+
+    @staticmethod
+    async def read_token_cache(current_user: Annotated[UserBase, Depends(get_admin_user)]):
+        return TokenCacheResponse(**AuthJWT.token_cache.snapshot())
+
+    @staticmethod
+    async def read_hash_pool(current_user: Annotated[UserBase, Depends(get_admin_user)]):
+        return HashPoolResponse(**AuthJWT.hasher.snapshot())
+
+    @staticmethod
+    async def read_partitions(current_user: Annotated[UserBase, Depends(get_admin_user)]):
+        partitions = []
+        for table in partitioned_tables():
+            partitions.extend(await DAO().Partition.get(table))
+        return [PartitionResponse(**partition) for partition in partitions]
+
+    @staticmethod
+    async def detach_partitions(current_user: Annotated[UserBase, Depends(get_admin_user)],
+                                request: DetachPartitionsRequest):
+        if request.table not in partitioned_tables():
+            raise HTTPException(status_code=400, detail="Table is not partitioned")
+        return await DAO().Partition.detach(request.table, request.before, request.drop)
@@ -47,6 +47,15 @@ class TokenData(BaseModel):
     user_id: str
     session_key: Optional[str]
     token_type: TokenType
+    issued_at: Optional[int] = None
+
+
+class Principal(BaseModel):
+    """
+    Пользователь из проверенного access-токена, без загрузки из базы
+    """
+    id: str
+    session_key: str
 
 
 class TokenInDB(BaseModel):
@@ -1,17 +1,26 @@
+import functools
 from typing import Optional
 
+from user_agents import parse
+
 from app.db.DAO import DAO
 from app.db.schema.Base import TokenType
+from app.jwt_auth.auth_jwt import AuthJWT
 from app.jwt_auth.exceptions import AuthenticateUserError
 from app.rest.User.entity import User
 from starlette import status
 
 
-async def post_session(session_key: str, user_agent: str):
-    result = await DAO().UserSession.post(session_key, user_agent)
-    if len(result.inserted_primary_key):
-        return False
-    return True
+def post_session(session_key: str, user_agent: str):
+    """
+    Отметка сессии записывается в базу фоновой задачей session_flush, вход её не ждёт
+    """
+    DAO().UserSession.touch(session_key, user_agent)
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_user_agent(user_agent: str) -> str:
+    return str(parse(user_agent))
 
 
 async def get_user(email: str = None, user_id: str = None, telegram_id: int = None) -> Optional[User]:
@@ -34,7 +43,7 @@ async def registration_user(email, password, telegram_id, session_key, name):
 
 
 async def create_confirm_code(user_id: str, code: int, type_code: TokenType):
-    result = await DAO().Confirm.post(user_id, code, type_code)
+    result = await DAO().Confirm.post(user_id, AuthJWT.sign_code(user_id, code, type_code), type_code)
     if len(result.inserted_primary_key) == 0:
         return False
     return True
@@ -44,6 +53,11 @@ async def get_confirm_code(token_type: TokenType, user_id: str):
     return await DAO().Confirm.get(token_type, user_id)
 
 
+async def check_confirm_code(token_type: TokenType, user_id: str, code: int) -> bool:
+    signature = await DAO().Confirm.attempt(token_type, user_id, AuthJWT.code_max_attempts)
+    return signature is not None and AuthJWT.verify_code(user_id, code, token_type, signature)
+
+
 async def confirm_code(user_id: str):
     return await DAO().User.update_confirm_email(user_id)
 
@@ -5,16 +5,17 @@ from fastapi import HTTPException, Request
 from fastapi.params import Depends
 from fastapi.security import OAuth2PasswordRequestForm
 from starlette import status
-from user_agents import parse
 
 from .entity import TokensResponse, RefreshTokenRequest, UserAuthenticationForm, WebTokenResponse, UserRegistrationForm, \
     TelegramLinkForm
 
-from .handler import get_user, registration_user, post_session, set_telegram_id, create_confirm_code
+from .handler import get_user, registration_user, post_session, set_telegram_id, create_confirm_code, \
+    parse_user_agent
 from ..ConfrimEmail.route import ConfirmEmail
 from ..CustomAPIRouter import APIRouter
 from ..EmailService import EmailService
 from ...db.DAO import DAO
+from ...db.Routing import use_consistency_key
 from ...db.schema.Base import TokenType
 from ...db.schema.Entity import User as UserBase
 from ...jwt_auth.auth_jwt import get_refresh_token, AuthJWT, tg_validate_token, get_current_user
@@ -105,13 +106,13 @@ class Authentication:
             user: UserBase = await get_user(telegram_id=form_data)
         else:
             user: UserBase = await authorize.authenticate_user(form_data.email, form_data.password)
+        use_consistency_key(user.id)
         if not user.session_key:
             user.session_key = await authorize.set_session_key(user.id)
         response = authorize.create_tokens(data={"sub": user.id,
                                                  "sid": user.session_key})
         response.email_verified = user.email_verified
-        if await post_session(user.session_key, str(parse(request.headers.getlist("user-agent")[0]))):
-            pass
+        post_session(user.session_key, parse_user_agent(request.headers.get("user-agent", "")))
         return response
 
     async def web_auth(self, form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
@@ -151,7 +152,8 @@ class Authentication:
                 detail="Already registered",
             )
         session_key = authorize.generate_session_key()
-        user_id = await registration_user(email=form_data.email, password=authorize.hash_value(form_data.password),
+        password = await authorize.hash_value_async(form_data.password)
+        user_id = await registration_user(email=form_data.email, password=password,
                                           telegram_id=None, name=form_data.name,
                                           session_key=session_key)
         if user_id:
@@ -190,15 +192,13 @@ class Authentication:
     @staticmethod
     async def send_link_code(user: UserModel):
         code_confirm = random.randint(1000, 9999)
-        await create_confirm_code(user.id, AuthJWT.hash_value(str(code_confirm)),
-                                  TokenType.LINK_TG)
-        print(code_confirm)
+        await create_confirm_code(user.id, code_confirm, TokenType.LINK_TG)
         EmailService().send_link_tg_code(code_confirm, user.email)
 
     @staticmethod
     async def send_link_tg_code(self, current_user: Annotated[UserModel, Depends(get_current_user)],
                                 authorize: AuthJWT = Depends()):
-        await self.send_link_code(current_user)
+        await self.send_link_code(await get_user(user_id=current_user.id))
         return 200
 
     @staticmethod
@@ -215,7 +215,7 @@ class Authentication:
                 detail="Already linked",
             )
 
-        if ConfirmEmail.confirm_code(user, form_data.code, token_type=TokenType.LINK_TG):
+        if await ConfirmEmail.confirm_code(user, form_data.code, token_type=TokenType.LINK_TG):
             await set_telegram_id(user_id=user.id, telegram_id=current_tg_id)
             return 200
 
@@ -6,13 +6,13 @@ from fastapi.params import Depends
 from starlette import status
 
 from ..Authentication.entity import ConfirmCodeRequest
-from ..Authentication.handler import create_confirm_code, get_confirm_code, confirm_code
+from ..Authentication.handler import create_confirm_code, check_confirm_code, confirm_code
 from ..CustomAPIRouter import APIRouter
 from ..EmailService import EmailService
 from ..User.entity import User as UserModel
 from ...db.schema.Base import TokenType
 from ...jwt_auth import AuthJWT
-from ...jwt_auth.auth_jwt import get_current_user
+from ...jwt_auth.auth_jwt import get_current_user, get_user
 
 
 class ConfirmEmail:
@@ -79,13 +79,12 @@ class ConfirmEmail:
     @classmethod
     async def send_code(cls, user_id, email, token_type: TokenType = TokenType.EMAIL_CONFIRMATION):
         code_confirm = random.randint(1000, 9999)
-        await create_confirm_code(user_id, AuthJWT.hash_value(str(code_confirm)),
-                                  TokenType.EMAIL_CONFIRMATION)
-        print(code_confirm)
+        await create_confirm_code(user_id, code_confirm, TokenType.EMAIL_CONFIRMATION)
         EmailService().send_verification_email_code(code_confirm, email)
 
     async def send_confirm_code_email(self, current_user: Annotated[UserModel, Depends(get_current_user)],
                                       authorize: AuthJWT = Depends()):
+        current_user = await get_user(current_user.id)
         if not current_user.email_verified:
             await self.send_code(current_user.id, current_user.email)
             return 200
@@ -96,15 +95,12 @@ class ConfirmEmail:
 
     @staticmethod
     async def confirm_code(current_user: UserModel, code: int, authorize: AuthJWT = Depends(), token_type: TokenType = TokenType.EMAIL_CONFIRMATION):
-        confirmation_token = await get_confirm_code(user_id=current_user.id, token_type=token_type)
-        if confirmation_token:
-            if AuthJWT.verify_value(str(code), confirmation_token.code):
-                return True
-        return False
+        return await check_confirm_code(token_type, current_user.id, code)
 
     async def confirm_email(self, current_user: Annotated[UserModel, Depends(get_current_user)],
                             request: ConfirmCodeRequest,
                             authorize: AuthJWT = Depends()):
+        current_user = await get_user(current_user.id)
         if current_user.email_verified:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
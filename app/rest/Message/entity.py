@@ -1,5 +1,10 @@
+from datetime import datetime
+from typing import Optional
+
 from pydantic import BaseModel
 
+from app.db.schema.Base import MessageContentType, SenderType, LanguageCode
+
 
 class CreateDialogueRequest(BaseModel):
     name: str
@@ -11,3 +16,40 @@ class CreateMessageRequest(BaseModel):
 
 class GetMessagesRequest(BaseModel):
     dialogue_id: str
+
+
+class LastMessageResponse(BaseModel):
+    id: int
+    content_type: MessageContentType
+    sender: SenderType
+    text: Optional[str]
+    timestamp: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class DialogueSummaryResponse(BaseModel):
+    id: str
+    name: str
+    message_count: int
+    last_activity_at: datetime
+    last_message: Optional[LastMessageResponse]
+
+    class Config:
+        from_attributes = True
+
+
+class MessageSearchResponse(BaseModel):
+    id: int
+    dialogue_id: str
+    content_type: MessageContentType
+    sender: SenderType
+    text: Optional[str]
+    timestamp: datetime
+    rank: float
+    # Экранированный HTML, совпадения в <mark>...</mark>
+    headline: Optional[str]
+
+    class Config:
+        from_attributes = True
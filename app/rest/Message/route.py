@@ -11,17 +11,20 @@ from typing import Annotated, Optional
 import aio_pika
 import numpy as np
 
-from fastapi import UploadFile
+from fastapi import UploadFile, Response, Query
 from fastapi.params import Depends, File, Form
 from starlette import status
 from starlette.exceptions import HTTPException
 
-from .entity import CreateDialogueRequest, CreateMessageRequest, GetMessagesRequest
+from .entity import CreateDialogueRequest, CreateMessageRequest, GetMessagesRequest, DialogueSummaryResponse, \
+    MessageSearchResponse
 from ..CustomAPIRouter import APIRouter
+from ..Pagination import PageParams, set_next_cursor
 from app.db.schema import User as UserSchema
 from ...db.DAO import DAO
-from ...db.schema.Base import TransactionType, MessageContentType, SenderType
-from ...jwt_auth.auth_jwt import get_current_active_user
+from ...db.schema.Base import TransactionType, MessageContentType, SenderType, LanguageCode
+from ..Authentication.entity import Principal
+from ...jwt_auth.auth_jwt import get_current_active_user, get_current_principal, get_user
 
 
 class RabbitMQManager:
@@ -128,6 +131,10 @@ class Message:
         self.route.add_api_route('/create_dialogue', self.create_dialogue, methods=["POST"])
         self.route.add_api_route('/get_messages', self.get_messages, methods=["GET"])
         self.route.add_api_route('/get_dialogues', self.get_dialogues, methods=["GET"])
+        self.route.add_api_route('/get_dialogue_summaries', self.get_dialogue_summaries, methods=["GET"],
+                                 response_model=list[DialogueSummaryResponse])
+        self.route.add_api_route('/search', self.search, methods=["GET"],
+                                 response_model=list[MessageSearchResponse])
 
     async def transcribe(self, current_user: Annotated[UserSchema, Depends(get_current_active_user)],
                          file: UploadFile):
@@ -144,7 +151,7 @@ class Message:
         if duration is None:
             duration = audio_array.shape[0] / 16000
 
-        if current_user.balance.voice_seconds < duration:
+        if (await get_user(current_user.id)).balance.voice_seconds < duration:
             return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Недостаточно средств")
 
         try:
@@ -181,26 +188,49 @@ class Message:
                                                     content_type=MessageContentType.TEXT_MESSAGE,
                                                     sender=SenderType.BOT, text=transcription['result'])
 
-        return {"message_id": result.inserted_primary_key[0], "bot_message": transcription['result']}
+        return {"message_id": result, "bot_message": transcription['result']}
 
     @staticmethod
-    async def create_dialogue(current_user: Annotated[UserSchema, Depends(get_current_active_user)],
+    async def create_dialogue(current_user: Annotated[Principal, Depends(get_current_principal)],
                               dialogue_request: CreateDialogueRequest):
         result = await DAO().Message.create_dialogue(current_user.id, dialogue_request.name)
 
         return {"dialogue_id": result.inserted_primary_key[0]}
 
     @staticmethod
-    async def get_dialogues(current_user: Annotated[UserSchema, Depends(get_current_active_user)]):
-        result = await DAO().Message.get_dialogues(current_user.id)
+    async def get_dialogues(current_user: Annotated[Principal, Depends(get_current_principal)],
+                            page_params: Annotated[PageParams, Depends()],
+                            response: Response):
+        result = await DAO().Message.get_dialogues(current_user.id, page_params.limit, page_params.after)
+        set_next_cursor(response, result)
+        return result.items
 
-        return result
+    @staticmethod
+    async def get_dialogue_summaries(current_user: Annotated[Principal, Depends(get_current_principal)],
+                                     page_params: Annotated[PageParams, Depends()],
+                                     response: Response):
+        result = await DAO().Message.get_dialogue_summaries(current_user.id, page_params.limit, page_params.after)
+        set_next_cursor(response, result)
+        return result.items
+
+    @staticmethod
+    async def search(current_user: Annotated[Principal, Depends(get_current_principal)],
+                     q: Annotated[str, Query(min_length=1, max_length=256)],
+                     page_params: Annotated[PageParams, Depends()],
+                     response: Response,
+                     language: Optional[LanguageCode] = None):
+        result = await DAO().Message.search(current_user.id, q, language, page_params.limit, page_params.after)
+        set_next_cursor(response, result)
+        return result.items
 
     @staticmethod
-    async def get_messages(current_user: Annotated[UserSchema, Depends(get_current_active_user)],
-                           dialogue_request: GetMessagesRequest):
-        result = await DAO().Message.get_messages(dialogue_request.dialogue_id)
-        return result
+    async def get_messages(current_user: Annotated[Principal, Depends(get_current_principal)],
+                           dialogue_request: GetMessagesRequest,
+                           page_params: Annotated[PageParams, Depends()],
+                           response: Response):
+        result = await DAO().Message.get_messages(dialogue_request.dialogue_id, page_params.limit, page_params.after)
+        set_next_cursor(response, result)
+        return result.items
 
 
 #     @staticmethod
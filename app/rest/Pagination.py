@@ -0,0 +1,27 @@
+from typing import Annotated, Optional
+
+from fastapi import HTTPException, Query, Response
+from starlette import status
+
+from app.db.Pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, Page, decode_cursor
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """
+    Параметры страницы: размер и непрозрачный курсор из заголовка X-Next-Cursor предыдущего ответа
+    """
+
+    def __init__(self, limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+                 cursor: Optional[str] = None):
+        self.limit = limit
+        try:
+            self.after = decode_cursor(cursor) if cursor else None
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def set_next_cursor(response: Response, page: Page):
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
@@ -11,7 +11,7 @@ from app.jwt_auth import AuthJWT
 from app.jwt_auth.auth_jwt import validate_token, get_current_active_user
 from app.rest.Authentication.entity import TokenResponse, EmailRequest, TokenData, ConfirmCodeRequest, \
     ResetPasswordRequest
-from app.rest.Authentication.handler import get_user, create_confirm_code, get_confirm_code, confirm_code, \
+from app.rest.Authentication.handler import get_user, create_confirm_code, check_confirm_code, confirm_code, \
     change_password
 from app.rest.CustomAPIRouter import APIRouter
 from app.rest.EmailService import EmailService
@@ -105,8 +105,7 @@ class ResetPassword:
         user = await get_user(request.email)
         if user:
             code_confirm = random.randint(100000, 999999)
-            print(code_confirm)
-            await create_confirm_code(user.id, authorize.hash_value(str(code_confirm)), TokenType.PASSWORD_RESET)
+            await create_confirm_code(user.id, code_confirm, TokenType.PASSWORD_RESET)
             EmailService().send_reset_password_code(code_confirm, user.email)
             confirm_code_token = authorize.create_token(data={"sub": user.id},
                                                         token_type=TokenType.CODE_CONFIRMATION)
@@ -121,12 +120,11 @@ class ResetPassword:
                                           request: ConfirmCodeRequest,
                                           authorize: AuthJWT = Depends()):
         if token.token_type == TokenType.CODE_CONFIRMATION:
-            confirmation_code = await get_confirm_code(TokenType.PASSWORD_RESET, user_id=token.user_id)
             await get_current_active_user(await DAO().User.get(user_id=token.user_id))
-            if confirmation_code and authorize.verify_value(str(request.code), confirmation_code.code):
+            if await check_confirm_code(TokenType.PASSWORD_RESET, token.user_id, request.code):
                 await confirm_code(token.user_id)
                 reset_password_token = authorize.create_token(
-                    data={"sub": confirmation_code.user_id,
+                    data={"sub": token.user_id,
                           "jti": authorize.generate_session_key()},
                     token_type=TokenType.PASSWORD_RESET
                 )
@@ -149,7 +147,7 @@ class ResetPassword:
             user = await get_user(user_id=token.user_id)
             if user:
                 await get_current_active_user(user)
-                if await change_password(user.id, authorize.hash_value(request.password)):
+                if await change_password(user.id, await authorize.hash_value_async(request.password)):
                     return 200
                 else:
                     raise HTTPException(
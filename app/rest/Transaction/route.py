@@ -1,11 +1,13 @@
 from typing import Annotated
 
-from fastapi import Depends
+from fastapi import Depends, Response
 
 from app.db.DAO import DAO
 from app.db.schema.Base import TransactionType
-from app.jwt_auth.auth_jwt import get_current_active_user
+from app.jwt_auth.auth_jwt import get_current_active_user, get_current_principal
+from app.rest.Authentication.entity import Principal
 from app.rest.CustomAPIRouter import APIRouter
+from app.rest.Pagination import PageParams, set_next_cursor
 from app.rest.Transaction.entity import TransactionResponse, TransactionsResponse, CreateTransactionRequest
 
 from app.rest.User.entity import User as UserModel
@@ -28,7 +30,10 @@ class Transaction:
         return 200
 
     @staticmethod
-    async def read_transactions(current_user: Annotated[UserModel, Depends(get_current_active_user)]):
-        transactions = await DAO().Transaction.get(current_user.id)
-        response = [TransactionResponse(**transaction.__dict__) for transaction in transactions]
+    async def read_transactions(current_user: Annotated[Principal, Depends(get_current_principal)],
+                                page_params: Annotated[PageParams, Depends()],
+                                http_response: Response):
+        transactions = await DAO().Transaction.get(current_user.id, page_params.limit, page_params.after)
+        set_next_cursor(http_response, transactions)
+        response = [TransactionResponse(**transaction.__dict__) for transaction in transactions.items]
         return TransactionsResponse(transactions=response)
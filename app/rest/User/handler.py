@@ -1,6 +1,5 @@
-from datetime import timedelta, datetime
-
 from app.db.DAO import DAO
+from app.jwt_auth.auth_jwt import AuthJWT
 from app.rest.User.entity import UserProfileResponse
 
 
@@ -8,8 +7,10 @@ def update_user_profile(user_id: str, **kwargs):
     return DAO().UserProfile.put(user_id, **kwargs)
 
 
-def delete_user(user_id: str):
-    return DAO().User.delete(user_id)
+async def delete_user(user_id: str):
+    result = await DAO().User.delete(user_id)
+    AuthJWT.revocations.revoke(user_id)
+    return result
 
 
 async def get_user_profile(user_id: str):
@@ -35,38 +36,5 @@ async def get_user_profile(user_id: str):
     return response
 
 
-async def calculate_days_in_row(user_id: str):
-    dialogues = await DAO().Dialogue.get_dialogues_with_last_message(user_id)
-    days_in_row_set = set()
-    last_date = datetime(1900, 1, 1)
-    for dialogue in dialogues:
-        days_in_row_set.add(dialogue.last_message.timestamp.date())
-        if last_date < dialogue.last_message.timestamp:
-            last_date = dialogue.last_message.timestamp
-
-    if len(days_in_row_set) == 0:
-        return 0
-
-    if last_date + timedelta(days=1) <= datetime.now():
-        return 0
-
-    days_in_row_set = sorted(days_in_row_set, reverse=True)
-
-    def get_count_days(last_date=last_date, days_in_row=days_in_row_set) -> int:
-        last_date_compared = last_date.date()
-        consecutive_days = 0
-
-        for current_date in days_in_row:
-            if last_date_compared - current_date <= timedelta(days=1):
-                consecutive_days += 1
-                last_date_compared = current_date
-            else:
-                break
-
-        return consecutive_days
-
-    return get_count_days()
-
-
-
-
+async def calculate_days_in_row(user_id: str) -> int:
+    return await DAO().Streak.get(user_id)
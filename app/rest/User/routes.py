@@ -1,14 +1,15 @@
 from typing import Annotated
 
-from fastapi import HTTPException, status
+from fastapi import HTTPException, Response, status
 from fastapi.params import Depends
 from sqlalchemy import CursorResult
 
 from app.db.DAO import DAO
 from app.db.schema import User as UserSchema
-from app.jwt_auth.auth_jwt import get_current_active_user
+from app.jwt_auth.auth_jwt import get_current_active_user, get_user
 from app.rest.Admin.entity import UserDetailsResponse, UsersResponse
 from app.rest.CustomAPIRouter import APIRouter
+from app.rest.Pagination import PageParams, set_next_cursor
 from app.rest.Transaction.entity import TransactionResponse
 from app.rest.User.entity import UserProfileResponse, User as UserModel, UserResponse, UserProfileUpdateRequest, \
     UserProfileUpdateResponse
@@ -100,17 +101,25 @@ class User:
 
     @staticmethod
     async def read_users_me(current_user: Annotated[UserSchema, Depends(get_current_active_user)]):
+        current_user = await get_user(current_user.id)
         return UserResponse(id=current_user.id, email=current_user.email, created_at=current_user.created_at, name=current_user.profile.name, balance=current_user.balance.voice_seconds, role=current_user.role)
 
     @staticmethod
-    async def web_me(current_user: Annotated[UserSchema, Depends(get_current_active_user)]):
+    async def web_me(current_user: Annotated[UserSchema, Depends(get_current_active_user)],
+                     page_params: Annotated[PageParams, Depends()],
+                     response: Response):
+        """
+        Профиль и страница транзакций, следующая страница - по курсору из заголовка X-Next-Cursor
+        """
+        current_user = await get_user(current_user.id)
         user = UsersResponse(id=current_user.id, email=current_user.email, created_at=current_user.created_at,
                              name=current_user.profile.name,
                              balance=current_user.balance.voice_seconds, role=current_user.role)
-        transactions = await DAO().Transaction.get(current_user.id)
-        response = [TransactionResponse(**transaction.__dict__) for transaction in transactions]
-        if user:
-            return UserDetailsResponse(**user.model_dump(), transactions=response)
+        transactions = await DAO().Transaction.get(current_user.id, page_params.limit, page_params.after)
+        set_next_cursor(response, transactions)
+        return UserDetailsResponse(**user.model_dump(),
+                                   transactions=[TransactionResponse(**transaction.__dict__)
+                                                 for transaction in transactions.items])
 
 
     @staticmethod
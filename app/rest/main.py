@@ -4,8 +4,11 @@ from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.openapi.docs import get_swagger_ui_html, get_swagger_ui_oauth2_redirect_html, get_redoc_html
 
+from app.db.CircuitBreaker import DatabaseUnavailableError
+from app.db.DAO import DAO
 from app.jwt_auth import AuthJWT
 from app.rest.Admin.route import Admin
 from app.rest.Authentication.route import Authentication
@@ -31,8 +34,11 @@ async def lifespan(app: FastAPI):
     host = os.environ.get("RABBITMQ_HOST", "localhost")
     Message.rabbitmq_manager = RabbitMQManager(rabbitmq_host=host, rabbitmq_port=5672)
     await Message.rabbitmq_manager.connect()
+    DAO().jobs.start()
     yield
     # Clean up the ML models and release the resources
+    await DAO().jobs.stop()
+    AuthJWT.hasher.shutdown()
     await Message.rabbitmq_manager.close()
 
 
@@ -67,12 +73,23 @@ async def redoc_html():
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
     start_time = time.time()
-    response = await call_next(request)
+    statements = DAO().n_plus_one.start()
+    try:
+        response = await call_next(request)
+    finally:
+        # Шаблон пути маршрута, чтобы запросы с разными id учитывались вместе
+        DAO().n_plus_one.finish(getattr(request.scope.get("route"), "path", request.url.path), statements)
     process_time = time.time() - start_time
     response.headers["X-Process-Time"] = str(process_time)
     return response
 
 
+@app.exception_handler(DatabaseUnavailableError)
+async def database_unavailable_handler(request: Request, exc: DatabaseUnavailableError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)},
+                        headers={"Retry-After": str(int(DAO().config.breaker_reset_timeout) or 1)})
+
+
 app.include_router(Authentication().route)
 app.include_router(ResetPassword().route)
 app.include_router(ConfirmEmail().route)
@@ -28,6 +28,14 @@ async def run_rpc():
     # await serve()
 
 
+def run_migrations():
+    """
+    Apply database migrations and store the schema fingerprint checked on startup
+    """
+    from app.db.DAO import DAO
+    asyncio.run(DAO().migrate())
+
+
 def run_server():
     """
     Run all in one
@@ -46,7 +54,8 @@ if __name__ == '__main__':
     launch_modes = {
         'server': run_server,
         'rpc': run_rpc,
-        'rest': run_fastapi
+        'rest': run_fastapi,
+        'migrate': run_migrations
     }
 
     parser = argparse.ArgumentParser()
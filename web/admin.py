@@ -49,7 +49,7 @@ def admin_dashboard(auth):
 @admin_bp.route('/users', methods=['GET'])
 @admin_required
 def admin_users(auth: Authentication):
-    response = requests.get(ADMIN_GET_ALL_USERS_END_POINT, headers={
+    response = requests.get(ADMIN_GET_ALL_USERS_END_POINT, params={'cursor': request.args.get('cursor')}, headers={
         'accept': 'application/json',
         "Authorization": f"Bearer {auth.get_access_token()}"})
 
@@ -64,7 +64,8 @@ def admin_users(auth: Authentication):
                     'email': user['email'],
                     'name': user['name']
                 })
-            return render_template('admin/users.html', users=users, title='Users', **auth.user.layout_kwargs())
+            return render_template('admin/users.html', users=users, title='Users',
+                                   next_cursor=response.headers.get('X-Next-Cursor'), **auth.user.layout_kwargs())
     flash('Something went wrong', 'danger')
     return redirect(url_for('admin.admin_dashboard'))
 
@@ -72,13 +73,14 @@ def admin_users(auth: Authentication):
 @admin_bp.route('/users/<user_id>', methods=['GET'])
 @admin_required
 def admin_user_detail(auth, user_id):
-    response = requests.get(ADMIN_USER_DETAIL_END_POINT + user_id, headers={
+    response = requests.get(ADMIN_USER_DETAIL_END_POINT + user_id, params={'cursor': request.args.get('cursor')}, headers={
         'accept': 'application/json',
         "Authorization": f"Bearer {auth.get_access_token()}"})
 
     if response.ok:
         user = response.json()
-        return render_template('admin/user_detail.html', user=user, title='User', **auth.user.layout_kwargs(), TransactionType=TransactionType)
+        return render_template('admin/user_detail.html', user=user, title='User', **auth.user.layout_kwargs(), TransactionType=TransactionType,
+                               next_cursor=response.headers.get('X-Next-Cursor'))
     flash('Something went wrong', 'danger')
     return redirect(url_for('admin.admin_dashboard'))
 
@@ -116,12 +118,13 @@ def admin_add_transaction(auth):
 @admin_bp.route('/transactions', methods=['GET'])
 @admin_required
 def admin_transactions(auth):
-    response = requests.get(ADMIN_TRANSACTIONS_END_POINT, headers={
+    response = requests.get(ADMIN_TRANSACTIONS_END_POINT, params={'cursor': request.args.get('cursor')}, headers={
         'accept': 'application/json',
         "Authorization": f"Bearer {auth.get_access_token()}"})
 
     if response.ok:
         transactions = response.json()
-        return render_template('admin/transactions.html', transactions=transactions, title='Transactions', **auth.user.layout_kwargs())
+        return render_template('admin/transactions.html', transactions=transactions, title='Transactions',
+                               next_cursor=response.headers.get('X-Next-Cursor'), **auth.user.layout_kwargs())
     flash('Something went wrong', 'danger')
     return redirect(url_for('admin.admin_dashboard'))
\ No newline at end of file
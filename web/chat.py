@@ -18,6 +18,17 @@ CREATE_CHAT_END_POINT = f"{BACKEND_URL}/message/create_dialogue"
 CREATE_MESSAGE_END_POINT = f"{BACKEND_URL}/message/create_message"
 
 
+def get_page(url, cursor=None, **kwargs):
+    """
+    Одна страница списка. Курсор следующей страницы из заголовка X-Next-Cursor отдаётся клиенту,
+    следующую страницу он запрашивает сам, когда она нужна
+    """
+    response = requests.get(url, params={'cursor': cursor} if cursor else None, **kwargs)
+    if not response.ok:
+        return response, [], None
+    return response, response.json(), response.headers.get('X-Next-Cursor')
+
+
 def authentication(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
@@ -42,20 +53,19 @@ def chat(auth):
 @authentication
 def get_chats(auth):
     try:
-        response = requests.get(CHATS_END_POINT, headers={
+        response, data, next_cursor = get_page(CHATS_END_POINT, request.args.get('cursor'), headers={
             'accept': 'application/json',
             "Authorization": f"Bearer {auth.get_access_token()}"
         })
 
         if response.ok:
-            data = response.json()
             response_chats = []
             for dialogue in data:
                 response_chats.append({
                     'id': dialogue['id'],
                     'name': dialogue['name']
                 })
-            return jsonify({'chats': response_chats})
+            return jsonify({'chats': response_chats, 'next_cursor': next_cursor})
     except Exception as e:
         logging.debug(f"Something went wrong: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -89,7 +99,7 @@ def create_chat(auth):
 @authentication
 def get_messages(auth, chat_id):
     try:
-        response = requests.get(MESSAGES_END_POINT, headers={
+        response, messages, next_cursor = get_page(MESSAGES_END_POINT, request.args.get('cursor'), headers={
             'accept': 'application/json',
             'Content-Type': 'application/json',
             "Authorization": f"Bearer {auth.get_access_token()}"
@@ -98,7 +108,6 @@ def get_messages(auth, chat_id):
         })
 
         if response.ok:
-            messages = response.json()
             response_messages = []
             for message in messages:
                 response_messages.append({
@@ -107,7 +116,7 @@ def get_messages(auth, chat_id):
                     "content": message['text'],
 
                 })
-            return jsonify({'messages': response_messages})
+            return jsonify({'messages': response_messages, 'next_cursor': next_cursor})
         raise response.text
     except Exception as e:
         logging.debug(f"Something went wrong: {str(e)}")
@@ -82,13 +82,14 @@ def page_profile(auth):
     if isinstance(auth, Exception):
         return redirect(url_for('index'))
 
-    response = requests.get(PROFILE_END_POINT, headers={
+    response = requests.get(PROFILE_END_POINT, params={'cursor': request.args.get('cursor')}, headers={
         'accept': 'application/json',
         "Authorization": f"Bearer {auth.get_access_token()}"})
 
     if response.ok:
         user = response.json()
-        return render_template('user_profile.html', user=user, title='Profile', **auth.user.layout_kwargs())
+        return render_template('user_profile.html', user=user, title='Profile', **auth.user.layout_kwargs(),
+                               next_cursor=response.headers.get('X-Next-Cursor'))
     flash('Something went wrong', 'danger')
     return redirect(url_for('index'))
 